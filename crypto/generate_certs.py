@@ -10,21 +10,24 @@ from pathlib import Path
 from crypto.key_manager import KeyManager
 
 
-def main():
-    """Generate certificates and keys for encrypted LLM chat."""
-    parser = argparse.ArgumentParser(description="Generate keys and certificates for encrypted LLM chat")
-    parser.add_argument("--ecc", action="store_true", help="Use ECC instead of RSA")
-    parser.add_argument("--certs-dir", default="certs", help="Directory to store certificates")
-    parser.add_argument("--force", action="store_true", help="Overwrite existing certificates")
-    
-    args = parser.parse_args()
+def generate_all(certs_dir: str = "certs", use_ecc: bool = False, force: bool = False) -> bool:
+    """
+    Generate user and model keys and certificates.
     
+    Args:
+        certs_dir: Directory to store certificates
+        use_ecc: Use ECC instead of RSA
+        force: Overwrite existing certificates
+        
+    Returns:
+        True if certificates were generated, False if existing ones were kept
+    """
     # Initialize key manager
-    key_manager = KeyManager(args.certs_dir)
+    key_manager = KeyManager(certs_dir)
     
     # Check if certificates already exist
-    certs_path = Path(args.certs_dir)
-    key_type = "ecc" if args.ecc else "rsa"
+    certs_path = Path(certs_dir)
+    key_type = "ecc" if use_ecc else "rsa"
     
     existing_files = [
         f"user_{key_type}_private_key.pem",
@@ -35,24 +38,24 @@ def main():
         f"model_{key_type}_certificate.pem"
     ]
     
-    if not args.force and any((certs_path / f).exists() for f in existing_files):
-        print(f"⚠️  {key_type.upper()} certificates already exist in {args.certs_dir}")
+    if not force and any((certs_path / f).exists() for f in existing_files):
+        print(f"⚠️  {key_type.upper()} certificates already exist in {certs_dir}")
         print("   Use --force to overwrite existing certificates")
-        return
+        return False
     
     print(f"🔑 Generating {key_type.upper()} keys and certificates...")
-    print(f"📁 Certificate directory: {args.certs_dir}")
+    print(f"📁 Certificate directory: {certs_dir}")
     
     # Generate user keys and certificate
     print("\n👤 Generating user keys and certificate...")
-    user_files = key_manager.setup_user_keys(use_ecc=args.ecc)
+    user_files = key_manager.setup_user_keys(use_ecc=use_ecc)
     print(f"   ✅ Private key: {user_files[0]}")
     print(f"   ✅ Public key: {user_files[1]}")
     print(f"   ✅ Certificate: {user_files[2]}")
     
     # Generate model keys and certificate  
     print("\n🤖 Generating model keys and certificate...")
-    model_files = key_manager.setup_model_keys(use_ecc=args.ecc)
+    model_files = key_manager.setup_model_keys(use_ecc=use_ecc)
     print(f"   ✅ Private key: {model_files[0]}")
     print(f"   ✅ Public key: {model_files[1]}")
     print(f"   ✅ Certificate: {model_files[2]}")
@@ -75,6 +78,20 @@ def main():
             f.write("*.crt\n")
             f.write("*.cert\n")
         print(f"   📝 Created {gitignore_path} to keep certificates private")
+    
+    return True
+
+
+def main():
+    """Generate certificates and keys for encrypted LLM chat."""
+    parser = argparse.ArgumentParser(description="Generate keys and certificates for encrypted LLM chat")
+    parser.add_argument("--ecc", action="store_true", help="Use ECC instead of RSA")
+    parser.add_argument("--certs-dir", default="certs", help="Directory to store certificates")
+    parser.add_argument("--force", action="store_true", help="Overwrite existing certificates")
+    
+    args = parser.parse_args()
+    
+    generate_all(args.certs_dir, use_ecc=args.ecc, force=args.force)
 
 
 if __name__ == "__main__":
@@ -8,6 +8,7 @@ Handles RSA/ECC key pair generation, certificate creation, and key storage.
 """
 
 import os
+import functools
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Tuple, Optional
@@ -21,6 +22,21 @@ from cryptography import x509
 from cryptography.x509.oid import NameOID
 
 
+# Parsed keys are cached per (absolute path, mtime) so rewritten files are reloaded
+@functools.lru_cache(maxsize=16)
+def _load_pem_private_key(path: str, mtime_ns: int, password: Optional[bytes]):
+    """Parse a PEM private key file."""
+    with open(path, 'rb') as f:
+        return serialization.load_pem_private_key(f.read(), password=password)
+
+
+@functools.lru_cache(maxsize=16)
+def _load_pem_public_key(path: str, mtime_ns: int):
+    """Parse a PEM public key file."""
+    with open(path, 'rb') as f:
+        return serialization.load_pem_public_key(f.read())
+
+
 class KeyManager:
     """Manages cryptographic keys and certificates for encrypted LLM chat."""
     
@@ -114,15 +130,18 @@ class KeyManager:
         with open(self.certs_dir / filepath, 'wb') as f:
             f.write(pem)
     
+    def _key_path(self, filepath: str) -> Tuple[str, int]:
+        """Resolve a key file to its canonical path and modification time."""
+        path = os.path.abspath(self.certs_dir / filepath)
+        return path, os.stat(path).st_mtime_ns
+    
     def load_private_key(self, filepath: str, password: Optional[bytes] = None):
-        """Load private key from file."""
-        with open(self.certs_dir / filepath, 'rb') as f:
-            return serialization.load_pem_private_key(f.read(), password=password)
+        """Load private key from file (cached until the file changes)."""
+        return _load_pem_private_key(*self._key_path(filepath), password)
     
     def load_public_key(self, filepath: str):
-        """Load public key from file."""
-        with open(self.certs_dir / filepath, 'rb') as f:
-            return serialization.load_pem_public_key(f.read())
+        """Load public key from file (cached until the file changes)."""
+        return _load_pem_public_key(*self._key_path(filepath))
     
     def load_certificate(self, filepath: str) -> x509.Certificate:
         """Load certificate from file."""
@@ -8,7 +8,9 @@ Provides secure message encryption using RSA/ECC with hybrid encryption
 import os
 import json
 import base64
-from typing import Dict, Any, Union
+import hashlib
+import threading
+from typing import Dict, Any, Union, Optional, List
 
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, ec, padding
@@ -17,6 +19,36 @@ from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography import x509
 
 
+# Per-thread pool of reusable ciphertext buffers for the AES-GCM path
+_BUF_POOL = threading.local()
+_BUF_POOL_MAX = 32
+# Buffers above this size are left to the GC rather than pooled
+_MAX_POOLED = 1 << 20
+
+
+def get_buf(n: int) -> bytearray:
+    """Get a buffer of at least n bytes, reusing a pooled one when possible."""
+    pool = getattr(_BUF_POOL, "bufs", None)
+    if pool is None:
+        pool = _BUF_POOL.bufs = []
+        _BUF_POOL.last = 0
+    
+    for i in range(len(pool) - 1, -1, -1):
+        if len(pool[i]) >= n:
+            return pool.pop(i)
+    
+    # Size new buffers to the last-seen request so similar-sized messages fit
+    return bytearray(max(n, _BUF_POOL.last))
+
+
+def put_buf(buf: bytearray, used: int):
+    """Return a buffer to the current thread's pool."""
+    _BUF_POOL.last = min(used, _MAX_POOLED)
+    pool = _BUF_POOL.bufs
+    if len(buf) <= _MAX_POOLED and len(pool) < _BUF_POOL_MAX:
+        pool.append(buf)
+
+
 class MessageCrypto:
     """Handles encryption and decryption of messages using hybrid cryptography."""
     
@@ -37,11 +69,17 @@ class MessageCrypto:
         cipher = Cipher(algorithms.AES(key), modes.GCM(iv))
         encryptor = cipher.encryptor()
         
-        # Encrypt data
-        ciphertext = encryptor.update(data) + encryptor.finalize()
+        # Encrypt data into a pooled buffer (update_into needs block_size - 1 bytes of slack)
+        buf = get_buf(len(data) + 15)
+        try:
+            n = encryptor.update_into(data, buf)
+            encryptor.finalize()
+            ciphertext_b64 = base64.b64encode(memoryview(buf)[:n]).decode()
+        finally:
+            put_buf(buf, len(data) + 15)
         
         return {
-            'ciphertext': base64.b64encode(ciphertext).decode(),
+            'ciphertext': ciphertext_b64,
             'iv': base64.b64encode(iv).decode(),
             'tag': base64.b64encode(encryptor.tag).decode()
         }
@@ -143,11 +181,57 @@ class MessageCrypto:
         aes_key = self._decrypt_aes(encrypted_data['encrypted_aes_key'], derived_key)
         return aes_key
     
+    def _key_fingerprint(self, public_key: Union[rsa.RSAPublicKey, ec.EllipticCurvePublicKey]) -> str:
+        """SHA-256 fingerprint of a public key, used to key session caches."""
+        der = public_key.public_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        return hashlib.sha256(der).hexdigest()
+    
+    def _session_key_for(
+        self,
+        public_key: Union[rsa.RSAPublicKey, ec.EllipticCurvePublicKey],
+        session: Optional[Dict[str, Any]]
+    ) -> tuple[bytes, str, str]:
+        """
+        Get (aes_key, encrypted_aes_key, key_type) for a recipient.
+        
+        Without a session a fresh AES key is wrapped for every message. With
+        one, the wrapped key is cached per recipient fingerprint so later
+        messages skip the RSA/ECC step; each message still gets its own nonce.
+        """
+        fingerprint = None
+        if session is not None:
+            fingerprint = self._key_fingerprint(public_key)
+            cached = session.setdefault("encrypt_keys", {}).get(fingerprint)
+            if cached is not None:
+                return cached
+        
+        # Generate AES key
+        aes_key = self._generate_aes_key()
+        
+        # Encrypt AES key with public key
+        if isinstance(public_key, rsa.RSAPublicKey):
+            encrypted_aes_key = self._encrypt_key_rsa(aes_key, public_key)
+            key_type = "rsa"
+        elif isinstance(public_key, ec.EllipticCurvePublicKey):
+            encrypted_aes_key = self._encrypt_key_ecc(aes_key, public_key)
+            key_type = "ecc"
+        else:
+            raise ValueError("Unsupported key type")
+        
+        if session is not None:
+            session["encrypt_keys"][fingerprint] = (aes_key, encrypted_aes_key, key_type)
+        
+        return aes_key, encrypted_aes_key, key_type
+    
     def encrypt_message(
         self, 
         message: str, 
         public_key: Union[rsa.RSAPublicKey, ec.EllipticCurvePublicKey],
-        metadata: Dict[str, Any] = None
+        metadata: Dict[str, Any] = None,
+        session: Optional[Dict[str, Any]] = None
     ) -> str:
         """
         Encrypt a message using hybrid encryption.
@@ -156,6 +240,8 @@ class MessageCrypto:
             message: The message to encrypt
             public_key: RSA or ECC public key
             metadata: Optional metadata to include
+            session: Optional dict caching the AES session key per recipient
+                across calls (mutated in place)
             
         Returns:
             Base64-encoded encrypted message bundle
@@ -163,22 +249,12 @@ class MessageCrypto:
         # Convert message to bytes
         message_bytes = message.encode('utf-8')
         
-        # Generate AES key
-        aes_key = self._generate_aes_key()
+        # Get the AES key and its wrapped form for this recipient
+        aes_key, encrypted_aes_key, key_type = self._session_key_for(public_key, session)
         
         # Encrypt message with AES
         encrypted_message = self._encrypt_aes(message_bytes, aes_key)
         
-        # Encrypt AES key with public key
-        if isinstance(public_key, rsa.RSAPublicKey):
-            encrypted_aes_key = self._encrypt_key_rsa(aes_key, public_key)
-            key_type = "rsa"
-        elif isinstance(public_key, ec.EllipticCurvePublicKey):
-            encrypted_aes_key = self._encrypt_key_ecc(aes_key, public_key)
-            key_type = "ecc"
-        else:
-            raise ValueError("Unsupported key type")
-        
         # Create message bundle
         bundle = {
             'version': '1.0',
@@ -192,10 +268,39 @@ class MessageCrypto:
         bundle_json = json.dumps(bundle)
         return base64.b64encode(bundle_json.encode()).decode()
     
+    def encrypt_message_batch(
+        self,
+        messages: List[str],
+        public_key: Union[rsa.RSAPublicKey, ec.EllipticCurvePublicKey],
+        metadata_list: Optional[List[Dict[str, Any]]] = None
+    ) -> List[str]:
+        """
+        Encrypt several messages for one recipient with a single key exchange.
+        
+        One AES session key is generated and wrapped once; every message is
+        still sealed with its own GCM nonce. The bundles share the same
+        encrypted_aes_key field and decrypt individually as usual.
+        
+        Args:
+            messages: The messages to encrypt
+            public_key: RSA or ECC public key
+            metadata_list: Optional per-message metadata, aligned with messages
+            
+        Returns:
+            Base64-encoded encrypted message bundles, in message order
+        """
+        metadata_list = metadata_list or [None] * len(messages)
+        session: Dict[str, Any] = {}
+        return [
+            self.encrypt_message(message, public_key, metadata, session=session)
+            for message, metadata in zip(messages, metadata_list)
+        ]
+    
     def decrypt_message(
         self, 
         encrypted_bundle: str, 
-        private_key: Union[rsa.RSAPrivateKey, ec.EllipticCurvePrivateKey]
+        private_key: Union[rsa.RSAPrivateKey, ec.EllipticCurvePrivateKey],
+        session: Optional[Dict[str, Any]] = None
     ) -> tuple[str, Dict[str, Any]]:
         """
         Decrypt a message using hybrid decryption.
@@ -203,6 +308,8 @@ class MessageCrypto:
         Args:
             encrypted_bundle: Base64-encoded encrypted message bundle
             private_key: RSA or ECC private key
+            session: Optional dict caching unwrapped AES session keys across
+                calls (mutated in place)
             
         Returns:
             Tuple of (decrypted_message, metadata)
@@ -217,13 +324,21 @@ class MessageCrypto:
         encrypted_message = bundle['encrypted_message']
         metadata = bundle.get('metadata', {})
         
+        # A wrapped key seen earlier in this session is already unwrapped
+        decrypt_keys = session.setdefault("decrypt_keys", {}) if session is not None else {}
+        aes_key = decrypt_keys.get(encrypted_aes_key)
+        
         # Decrypt AES key
-        if key_type == "rsa" and isinstance(private_key, rsa.RSAPrivateKey):
-            aes_key = self._decrypt_key_rsa(encrypted_aes_key, private_key)
-        elif key_type == "ecc" and isinstance(private_key, ec.EllipticCurvePrivateKey):
-            aes_key = self._decrypt_key_ecc(encrypted_aes_key, private_key)
-        else:
-            raise ValueError(f"Key type mismatch: bundle has {key_type}, got {type(private_key)}")
+        if aes_key is None:
+            if key_type == "rsa" and isinstance(private_key, rsa.RSAPrivateKey):
+                aes_key = self._decrypt_key_rsa(encrypted_aes_key, private_key)
+            elif key_type == "ecc" and isinstance(private_key, ec.EllipticCurvePrivateKey):
+                aes_key = self._decrypt_key_ecc(encrypted_aes_key, private_key)
+            else:
+                raise ValueError(f"Key type mismatch: bundle has {key_type}, got {type(private_key)}")
+            
+            if session is not None:
+                decrypt_keys[encrypted_aes_key] = aes_key
         
         # Decrypt message
         message_bytes = self._decrypt_aes(encrypted_message, aes_key)
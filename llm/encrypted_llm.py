@@ -5,9 +5,22 @@ Integrates the LLM with the encryption system to provide secure AI inference.
 This is the core component that combines crypto and LLM functionality.
 """
 
+import os
 import time
 import json
-from typing import Dict, Any, Optional, Tuple, List
+import uuid
+import asyncio
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple, List, Iterator
+
+try:
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.history import InMemoryHistory
+    from prompt_toolkit.patch_stdout import patch_stdout
+    PROMPT_TOOLKIT_AVAILABLE = True
+except ImportError:
+    PROMPT_TOOLKIT_AVAILABLE = False
 
 from crypto.key_manager import KeyManager
 from crypto.message_crypto import MessageCrypto
@@ -15,6 +28,11 @@ from crypto.conversation_memory import EncryptedConversationMemory
 from llm.model_manager import ModelManager
 
 
+def _now_iso() -> str:
+    """Current timestamp in the format used for message metadata."""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
 class EncryptedLLM:
     """
     Encrypted LLM wrapper that handles the complete flow:
@@ -31,7 +49,8 @@ class EncryptedLLM:
         key_type: str = "rsa",
         certs_dir: str = "certs",
         enable_memory: bool = True,
-        memory_storage_dir: str = "conversations"
+        memory_storage_dir: str = "conversations",
+        max_prompt_chars: int = 8000
     ):
         """
         Initialize EncryptedLLM.
@@ -42,10 +61,12 @@ class EncryptedLLM:
             certs_dir: Directory containing certificates
             enable_memory: Enable persistent conversation memory
             memory_storage_dir: Directory for conversation storage
+            max_prompt_chars: Longest decrypted prompt accepted for generation
         """
         self.model_name = model_name
         self.key_type = key_type
         self.enable_memory = enable_memory
+        self.max_prompt_chars = max_prompt_chars
         
         # Initialize components
         self.key_manager = KeyManager(certs_dir)
@@ -115,12 +136,29 @@ class EncryptedLLM:
             print(f"❌ Failed to load {self.model_name}")
             return False
     
+    def prewarm_crypto(self):
+        """
+        Run a throwaway round trip in both directions so the first real message
+        doesn't pay for lazy OpenSSL/cffi initialization.
+        
+        The keys themselves are already parsed objects (see _load_keys).
+        """
+        try:
+            for public_key, private_key in (
+                (self.model_public_key, self.model_private_key),
+                (self.user_public_key, self.user_private_key)
+            ):
+                self.crypto.decrypt_message(self.crypto.encrypt_message("warmup", public_key), private_key)
+        except Exception as e:
+            print(f"⚠️  Crypto prewarm failed: {e}")
+    
     def process_encrypted_prompt(
         self,
         encrypted_bundle: str,
         generation_params: Optional[Dict[str, Any]] = None,
         conversation_id: Optional[str] = None,
-        use_context: bool = True
+        use_context: bool = True,
+        session_state: Optional[Dict[str, Any]] = None
     ) -> str:
         """
         Process an encrypted prompt and return encrypted response.
@@ -137,26 +175,149 @@ class EncryptedLLM:
             generation_params: Optional parameters for text generation
             conversation_id: Optional conversation ID for memory
             use_context: Whether to use conversation context
+            session_state: Optional dict carried across turns (updated in place).
+                It caches AES session keys, so repeat turns skip the RSA/ECC
+                key exchange, and keys the model's KV cache for reuse
             
         Returns:
             Encrypted response bundle for user
         """
-        if not self.model_loaded:
-            if not self.initialize_model():
-                error_response = "❌ Model not available"
-                return self._encrypt_response_for_user(error_response, {"error": "model_not_loaded"})
+        # Without streaming, the only event is the final one
+        for _, text, metadata in self._prompt_events(
+            encrypted_bundle, generation_params, conversation_id, use_context, session_state, stream=False
+        ):
+            pass
+        
+        print("🔐 Encrypting response for user...")
+        encrypted_response = self._encrypt_response_for_user(text, metadata, session_state)
+        print(f"   🔐 Encrypted response size: {len(encrypted_response)} characters")
+        
+        return encrypted_response
+    
+    def process_encrypted_prompt_stream(
+        self,
+        encrypted_bundle: str,
+        generation_params: Optional[Dict[str, Any]] = None,
+        conversation_id: Optional[str] = None,
+        use_context: bool = True,
+        session_state: Optional[Dict[str, Any]] = None
+    ) -> Iterator[str]:
+        """
+        Process an encrypted prompt, yielding the response as encrypted frames.
+        
+        Every frame is a normal encrypted bundle for the user, sealed under one
+        AES session key with its own nonce, so partial output is never exposed
+        in plaintext. Intermediate frames carry a text chunk and
+        {"stream_seq": n} metadata. The last frame carries the complete
+        cleaned response (or error) with the usual response metadata plus
+        {"final": True}.
+        
+        Args:
+            encrypted_bundle: Encrypted prompt from user
+            generation_params: Optional parameters for text generation
+            conversation_id: Optional conversation ID for memory
+            use_context: Whether to use conversation context
+            session_state: Optional dict carried across turns (updated in place)
+            
+        Yields:
+            Encrypted response frames for user
+        """
+        # Frames of one response always share a session key
+        if session_state is None:
+            session_state = {}
+        
+        seq = 0
+        for kind, text, metadata in self._prompt_events(
+            encrypted_bundle, generation_params, conversation_id, use_context, session_state, stream=True
+        ):
+            if kind == "chunk":
+                seq += 1
+                yield self._encrypt_response_for_user(text, {"stream_seq": seq}, session_state)
+            else:
+                yield self._encrypt_response_for_user(text, {**metadata, "final": True}, session_state)
+    
+    def process_encrypted_prompt_candidates(
+        self,
+        encrypted_bundle: str,
+        generation_params: Optional[Dict[str, Any]] = None,
+        conversation_id: Optional[str] = None,
+        use_context: bool = True,
+        session_state: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """
+        Process an encrypted prompt into several alternative encrypted responses.
+        
+        All candidates are sampled in one batched generate call; set
+        generation_params["n_candidates"] (default 4). Each candidate is
+        encrypted separately. Only the first is saved to conversation memory.
         
+        Args:
+            encrypted_bundle: Encrypted prompt from user
+            generation_params: Optional parameters for text generation
+            conversation_id: Optional conversation ID for memory
+            use_context: Whether to use conversation context
+            session_state: Optional dict carried across turns (updated in place)
+            
+        Returns:
+            Encrypted candidate bundles for user (a single error bundle on failure)
+        """
+        params = dict(generation_params or {})
+        params.setdefault("n_candidates", 4)
+        
+        candidates = []
+        for kind, text, metadata in self._prompt_events(
+            encrypted_bundle, params, conversation_id, use_context, session_state, stream=False
+        ):
+            if kind == "candidate" or not candidates:
+                candidates.append(self._encrypt_response_for_user(text, metadata, session_state))
+        
+        return candidates
+    
+    def _prompt_events(
+        self,
+        encrypted_bundle: str,
+        generation_params: Optional[Dict[str, Any]],
+        conversation_id: Optional[str],
+        use_context: bool,
+        session_state: Optional[Dict[str, Any]],
+        stream: bool
+    ) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Run the secure LLM flow, yielding plaintext (kind, text, metadata) events.
+        
+        With stream=True, ("chunk", text, {}) events are yielded as tokens are
+        generated. With generation_params["n_candidates"] > 1, each sampled
+        alternative is yielded as ("candidate", text, metadata) first. The last
+        event is always ("done", text, metadata) holding the full (first)
+        response or an error message; callers encrypt whatever they send on.
+        """
         try:
             # Step 1: Decrypt the incoming prompt
             print("🔓 Decrypting incoming prompt...")
             decrypted_prompt, metadata = self.crypto.decrypt_message(
                 encrypted_bundle,
-                self.model_private_key
+                self.model_private_key,
+                session=session_state
             )
             
             print(f"   📝 Decrypted prompt: {decrypted_prompt}")
             print(f"   📋 Metadata: {json.dumps(metadata, indent=2)}")
             
+            # Reject prompts that would waste model time before loading/generating
+            if not decrypted_prompt.strip():
+                yield "done", "❌ Empty prompt", {"error": "empty"}
+                return
+            
+            if len(decrypted_prompt) > self.max_prompt_chars:
+                error_response = f"❌ Prompt too long ({len(decrypted_prompt)} chars, max {self.max_prompt_chars})"
+                yield "done", error_response, {"error": "prompt_too_long"}
+                return
+            
+            if not self.model_loaded:
+                if not self.initialize_model():
+                    yield "done", "❌ Model not available", {"error": "model_not_loaded"}
+                    return
+            
             # Step 2: Handle conversation memory
             conversation_context = ""
             if self.enable_memory and conversation_id and use_context:
@@ -187,7 +348,8 @@ Assistant:"""
             start_time = time.time()
             
             # Set default generation parameters
-            gen_params = generation_params or {}
+            gen_params = dict(generation_params or {})
+            n_candidates = gen_params.pop("n_candidates", 1)
             default_params = {
                 "max_length": 512,
                 "temperature": 0.7,
@@ -196,10 +358,36 @@ Assistant:"""
             }
             default_params.update(gen_params)
             
-            llm_response = self.model_manager.generate_response(
-                enhanced_prompt,
-                **default_params
-            )
+            # Without a conversation, a session still gets its own KV cache slot
+            kv_cache_id = conversation_id
+            if kv_cache_id is None and session_state is not None:
+                kv_cache_id = session_state.setdefault("kv_cache_id", f"session_{uuid.uuid4().hex}")
+            
+            candidates = []
+            if n_candidates > 1:
+                candidate_params = {k: v for k, v in default_params.items() if k != "do_sample"}
+                candidates = self.model_manager.generate_candidates(
+                    enhanced_prompt,
+                    n=n_candidates,
+                    **candidate_params
+                )
+                llm_response = candidates[0]
+            elif stream:
+                chunks = []
+                for chunk in self.model_manager.generate_response_stream(
+                    enhanced_prompt,
+                    conversation_id=kv_cache_id,
+                    **default_params
+                ):
+                    chunks.append(chunk)
+                    yield "chunk", chunk, {}
+                llm_response = "".join(chunks)
+            else:
+                llm_response = self.model_manager.generate_response(
+                    enhanced_prompt,
+                    conversation_id=kv_cache_id,
+                    **default_params
+                )
             
             generation_time = time.time() - start_time
             print(f"   🤖 Generated response: {llm_response}")
@@ -236,10 +424,9 @@ Assistant:"""
                 except Exception as e:
                     print(f"   ⚠️  Failed to save to memory: {e}")
             
-            # Step 6: Encrypt response for user
-            print("🔐 Encrypting response for user...")
+            # Step 6: Hand the response back to be encrypted for the user
             response_metadata = {
-                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "timestamp": _now_iso(),
                 "model_name": self.model_name,
                 "generation_time_seconds": round(generation_time, 2),
                 "original_prompt_hash": hash(decrypted_prompt) % 10000,
@@ -249,11 +436,10 @@ Assistant:"""
                 "context_used": bool(conversation_context)
             }
             
-            encrypted_response = self._encrypt_response_for_user(llm_response, response_metadata)
+            for candidate in candidates:
+                yield "candidate", candidate, {**response_metadata, "response_length": len(candidate)}
             
-            print(f"   🔐 Encrypted response size: {len(encrypted_response)} characters")
-            
-            return encrypted_response
+            yield "done", llm_response, response_metadata
             
         except Exception as e:
             print(f"❌ Error processing encrypted prompt: {e}")
@@ -261,17 +447,103 @@ Assistant:"""
             error_metadata = {
                 "error": True,
                 "error_type": type(e).__name__,
-                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "timestamp": _now_iso(),
                 "conversation_id": conversation_id
             }
-            return self._encrypt_response_for_user(error_response, error_metadata)
+            yield "done", error_response, error_metadata
     
-    def _encrypt_response_for_user(self, response: str, metadata: Dict[str, Any]) -> str:
+    def process_batch(
+        self,
+        encrypted_bundles: List[str],
+        generation_params: Optional[Dict[str, Any]] = None,
+        session_state: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """
+        Process several independent encrypted prompts with one batched generate call.
+        
+        Each prompt is decrypted, all of them are generated together, and each
+        response is encrypted separately under its own fresh AES key, keeping
+        the conversations cryptographically isolated from each other.
+        Conversation memory is not used.
+        
+        Args:
+            encrypted_bundles: Encrypted prompts from the user
+            generation_params: Optional parameters for text generation
+            session_state: Optional dict caching AES session keys for prompt decryption
+            
+        Returns:
+            Encrypted response bundles, in prompt order
+        """
+        try:
+            print(f"🔓 Decrypting {len(encrypted_bundles)} incoming prompts...")
+            prompts = [
+                self.crypto.decrypt_message(bundle, self.model_private_key, session=session_state)[0]
+                for bundle in encrypted_bundles
+            ]
+            
+            for prompt in prompts:
+                if not prompt.strip() or len(prompt) > self.max_prompt_chars:
+                    error_response = f"❌ Batch rejected: prompts must be non-empty and at most {self.max_prompt_chars} chars"
+                    return [self._encrypt_response_for_user(error_response, {"error": "invalid_prompt"})] * len(prompts)
+            
+            if not self.model_loaded:
+                if not self.initialize_model():
+                    error_response = "❌ Model not available"
+                    return [self._encrypt_response_for_user(error_response, {"error": "model_not_loaded"})] * len(prompts)
+            
+            # Set default generation parameters
+            default_params = {
+                "max_length": 512,
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "do_sample": True
+            }
+            default_params.update(generation_params or {})
+            
+            print(f"🧠 Generating {len(prompts)} LLM responses in one batch...")
+            start_time = time.time()
+            llm_responses = self.model_manager.generate_batch(prompts, **default_params)
+            generation_time = time.time() - start_time
+            print(f"   ⏱️  Batch generation time: {generation_time:.2f}s")
+            
+            print("🔐 Encrypting responses for user...")
+            encrypted_responses = []
+            for prompt, llm_response in zip(prompts, llm_responses):
+                response_metadata = {
+                    "timestamp": _now_iso(),
+                    "model_name": self.model_name,
+                    "generation_time_seconds": round(generation_time, 2),
+                    "original_prompt_hash": hash(prompt) % 10000,
+                    "response_length": len(llm_response),
+                    "generation_params": default_params,
+                    "batch_size": len(prompts)
+                }
+                encrypted_responses.append(self._encrypt_response_for_user(llm_response, response_metadata))
+            
+            return encrypted_responses
+            
+        except Exception as e:
+            print(f"❌ Error processing encrypted batch: {e}")
+            error_response = f"❌ Error: {str(e)}"
+            error_metadata = {
+                "error": True,
+                "error_type": type(e).__name__,
+                "timestamp": _now_iso()
+            }
+            return [self._encrypt_response_for_user(error_response, error_metadata)] * len(encrypted_bundles)
+    
+    def _encrypt_response_for_user(
+        self,
+        response: str,
+        metadata: Dict[str, Any],
+        session_state: Optional[Dict[str, Any]] = None
+    ) -> str:
         """Encrypt a response for the user."""
         return self.crypto.encrypt_message(
             response,
             self.user_public_key,
-            metadata
+            metadata,
+            session=session_state
         )
     
     # Conversation Management Methods
@@ -407,14 +679,35 @@ Assistant:"""
             print("❌ Failed to initialize model. Exiting.")
             return
         
-        conversation_count = 0
+        try:
+            asyncio.run(self._chat_loop())
+        except KeyboardInterrupt:
+            print("\n\n👋 Chat session interrupted. Goodbye!")
+    
+    async def _chat_loop(self):
+        """Read prompts while earlier ones are still being processed."""
+        pending = asyncio.Queue()
+        self._messages_in_flight = 0
+        worker = asyncio.create_task(self._chat_worker(pending))
+        read_line = self._make_line_reader()
+        
+        # Let worker output scroll above the prompt instead of clobbering it
+        stdout_ctx = patch_stdout() if PROMPT_TOOLKIT_AVAILABLE else contextlib.nullcontext()
         
-        while True:
-            try:
-                # Get user input
-                user_input = input(f"\n💬 Your message: ").strip()
+        with stdout_ctx:
+            while True:
+                try:
+                    # Get user input
+                    user_input = (await read_line("\n💬 Your message: ")).strip()
+                except (KeyboardInterrupt, EOFError):
+                    print("\n\n👋 Chat session interrupted. Goodbye!")
+                    worker.cancel()
+                    return
                 
                 if user_input.lower() in ['quit', 'exit', 'q']:
+                    if self._messages_in_flight:
+                        print("⏳ Waiting for queued messages to finish...")
+                    await pending.join()
                     print("\n👋 Ending encrypted chat session. Goodbye!")
                     break
                 
@@ -425,48 +718,81 @@ Assistant:"""
                 if not user_input:
                     continue
                 
-                conversation_count += 1
-                print(f"\n🔄 Processing message {conversation_count}...")
-                
-                # Simulate user encrypting prompt (user perspective)
-                print("👤 User: Encrypting prompt...")
-                user_metadata = {
-                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                    "user_id": "interactive_user",
-                    "conversation_id": f"session_{int(time.time())}",
-                    "message_number": conversation_count
-                }
-                
-                encrypted_prompt = self.crypto.encrypt_message(
-                    user_input,
-                    self.model_public_key,
-                    user_metadata
-                )
-                
-                # Process with encrypted LLM
-                encrypted_response = self.process_encrypted_prompt(encrypted_prompt)
-                
-                # Simulate user decrypting response (user perspective)
-                print("👤 User: Decrypting response...")
-                decrypted_response, response_metadata = self.crypto.decrypt_message(
-                    encrypted_response,
-                    self.user_private_key
-                )
-                
-                print("\n" + "=" * 50)
-                print(f"✨ ENCRYPTED LLM RESPONSE:")
-                print(f"{decrypted_response}")
-                print("=" * 50)
+                if self._messages_in_flight:
+                    print(f"⏳ Queued behind {self._messages_in_flight} message(s) still generating")
                 
-                # Show some metadata
-                if response_metadata.get("generation_time_seconds"):
-                    print(f"⏱️  Generation time: {response_metadata['generation_time_seconds']}s")
-                
-            except KeyboardInterrupt:
-                print("\n\n👋 Chat session interrupted. Goodbye!")
-                break
+                self._messages_in_flight += 1
+                await pending.put(user_input)
+        
+        worker.cancel()
+    
+    def _make_line_reader(self):
+        """Return an async callable that reads one line of user input."""
+        if PROMPT_TOOLKIT_AVAILABLE:
+            session = PromptSession(history=InMemoryHistory())
+            return session.prompt_async
+        
+        async def read_line(prompt: str) -> str:
+            return await asyncio.to_thread(input, prompt)
+        
+        return read_line
+    
+    async def _chat_worker(self, pending: asyncio.Queue):
+        """Process queued prompts one at a time off the event loop."""
+        # One id for the whole session; message_number tells messages apart
+        session_id = f"session_{int(time.time())}"
+        
+        # Session-constant fields are built once; only the per-message ones change
+        user_metadata = {
+            "user_id": "interactive_user",
+            "conversation_id": session_id,
+            "message_number": 0,
+            "timestamp": ""
+        }
+        
+        while True:
+            user_input = await pending.get()
+            user_metadata["message_number"] += 1
+            user_metadata["timestamp"] = _now_iso()
+            try:
+                await asyncio.to_thread(self._process_chat_message, user_input, user_metadata)
             except Exception as e:
                 print(f"\n❌ Error in chat session: {e}")
+            finally:
+                self._messages_in_flight -= 1
+                pending.task_done()
+    
+    def _process_chat_message(self, user_input: str, user_metadata: Dict[str, Any]):
+        """Encrypt, process and decrypt a single chat message."""
+        print(f"\n🔄 Processing message {user_metadata['message_number']}...")
+        
+        # Simulate user encrypting prompt (user perspective)
+        print("👤 User: Encrypting prompt...")
+        # encrypt_message serializes the metadata immediately, so the shared dict is safe to reuse
+        encrypted_prompt = self.crypto.encrypt_message(
+            user_input,
+            self.model_public_key,
+            user_metadata
+        )
+        
+        # Process with encrypted LLM
+        encrypted_response = self.process_encrypted_prompt(encrypted_prompt)
+        
+        # Simulate user decrypting response (user perspective)
+        print("👤 User: Decrypting response...")
+        decrypted_response, response_metadata = self.crypto.decrypt_message(
+            encrypted_response,
+            self.user_private_key
+        )
+        
+        print("\n" + "=" * 50)
+        print(f"✨ ENCRYPTED LLM RESPONSE:")
+        print(f"{decrypted_response}")
+        print("=" * 50)
+        
+        # Show some metadata
+        if response_metadata.get("generation_time_seconds"):
+            print(f"⏱️  Generation time: {response_metadata['generation_time_seconds']}s")
     
     def _show_model_info(self):
         """Show model information."""
@@ -518,28 +844,36 @@ def main():
             
             print("🧪 Running batch test of encrypted LLM...")
             
-            for i, prompt in enumerate(test_prompts, 1):
-                print(f"\n📋 Test {i}/{len(test_prompts)}")
-                print("=" * 40)
-                
-                # Encrypt prompt
-                encrypted_prompt = encrypted_llm.crypto.encrypt_message(
-                    prompt,
-                    encrypted_llm.model_public_key,
-                    {"test_id": i, "batch": True}
-                )
-                
-                # Process
-                encrypted_response = encrypted_llm.process_encrypted_prompt(encrypted_prompt)
+            crypto = encrypted_llm.crypto
+            
+            # Crypto is independent per prompt and OpenSSL releases the GIL,
+            # so encryption/decryption fan out across a thread pool
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                encrypted_prompts = list(executor.map(
+                    lambda item: crypto.encrypt_message(
+                        item[1],
+                        encrypted_llm.model_public_key,
+                        {"test_id": item[0], "batch": True}
+                    ),
+                    enumerate(test_prompts, 1)
+                ))
                 
-                # Decrypt response
-                response, metadata = encrypted_llm.crypto.decrypt_message(
-                    encrypted_response,
-                    encrypted_llm.user_private_key
-                )
+                # Generation shares the single loaded model, so it stays sequential
+                encrypted_responses = []
+                for i, encrypted_prompt in enumerate(encrypted_prompts, 1):
+                    print(f"\n📋 Test {i}/{len(test_prompts)}")
+                    print("=" * 40)
+                    encrypted_responses.append(
+                        encrypted_llm.process_encrypted_prompt(encrypted_prompt)
+                    )
                 
-                print(f"✨ Result: {response}")
-                time.sleep(1)  # Brief pause between tests
+                results = list(executor.map(
+                    lambda bundle: crypto.decrypt_message(bundle, encrypted_llm.user_private_key),
+                    encrypted_responses
+                ))
+            
+            for i, (response, metadata) in enumerate(results, 1):
+                print(f"✨ Result {i}: {response}")
         else:
             # Run interactive session
             encrypted_llm.chat_session()
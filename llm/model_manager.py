@@ -6,21 +6,109 @@ Optimized for 8GB VRAM systems with quantization support.
 """
 
 import os
+import re
 import gc
-import torch
-from typing import Optional, Dict, Any, List
+import threading
+import importlib.util
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple, Iterator
 from pathlib import Path
 
-try:
-    from transformers import (
-        AutoTokenizer, AutoModelForCausalLM, 
-        BitsAndBytesConfig, pipeline
-    )
-    from accelerate import infer_auto_device_map
-    TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
-    print("⚠️  Transformers not available. Install with: pip install transformers torch accelerate")
+# torch and transformers take seconds to import, so they are loaded on first
+# ModelManager construction (see _load_backend) rather than at module import.
+# That keeps list_supported_models() and other pure-metadata callers fast.
+torch = None
+AutoTokenizer = AutoModelForCausalLM = BitsAndBytesConfig = BatchEncoding = None
+TextIteratorStreamer = StoppingCriteriaList = OffloadedCache = None
+TRANSFORMERS_AVAILABLE = None  # unknown until _load_backend() runs
+
+# Checked without importing, since flash_attn itself pulls in torch
+FLASH_ATTN_AVAILABLE = importlib.util.find_spec("flash_attn") is not None
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "encrypted_llm_chat"
+
+
+def _load_backend(cache_dir: Optional[Path] = None) -> bool:
+    """
+    Import torch/transformers into module globals on first use.
+    
+    Args:
+        cache_dir: Model cache directory; torch.compile artifacts are kept
+            under it so restarts skip the cold compile
+    """
+    global torch, AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig, BatchEncoding
+    global TextIteratorStreamer, StoppingCriteriaList, OffloadedCache
+    global TRANSFORMERS_AVAILABLE
+    
+    if TRANSFORMERS_AVAILABLE is not None:
+        return TRANSFORMERS_AVAILABLE
+    
+    # Inductor and Triton read these when torch is imported, so set them first
+    cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", str(cache_dir / "inductor"))
+    os.environ.setdefault("TRITON_CACHE_DIR", str(cache_dir / "triton"))
+    
+    try:
+        import torch
+        from transformers import (
+            AutoTokenizer, AutoModelForCausalLM, 
+            BitsAndBytesConfig, BatchEncoding,
+            TextIteratorStreamer, StoppingCriteriaList
+        )
+        TRANSFORMERS_AVAILABLE = True
+    except ImportError:
+        TRANSFORMERS_AVAILABLE = False
+        print("⚠️  Transformers not available. Install with: pip install transformers torch accelerate")
+        return False
+    
+    try:
+        # Only in newer transformers releases; KV offload is skipped without it
+        from transformers import OffloadedCache
+    except ImportError:
+        OffloadedCache = None
+    
+    return TRANSFORMERS_AVAILABLE
+
+
+class _EventStoppingCriteria:
+    """
+    Stops generation once the given event is set (e.g. the stream consumer went away).
+    
+    Follows the transformers StoppingCriteria call protocol; it does not
+    subclass it so this module can be imported without transformers.
+    """
+    
+    def __init__(self, event: threading.Event):
+        self.event = event
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full(
+            (input_ids.shape[0],),
+            self.event.is_set(),
+            dtype=torch.bool,
+            device=input_ids.device
+        )
+
+
+class _TokenBudgetCriteria:
+    """
+    Stops generation once max_new_tokens tokens follow a prompt of prompt_length.
+    
+    Lets generate run with a rounded-up max_new_tokens (which sizes the static
+    KV cache) while still ending at the length the caller asked for.
+    """
+    
+    def __init__(self, prompt_length: int, max_new_tokens: int):
+        self.prompt_length = prompt_length
+        self.max_new_tokens = max_new_tokens
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full(
+            (input_ids.shape[0],),
+            input_ids.shape[-1] - self.prompt_length >= self.max_new_tokens,
+            dtype=torch.bool,
+            device=input_ids.device
+        )
 
 
 class ModelManager:
@@ -30,60 +118,158 @@ class ModelManager:
     SUPPORTED_MODELS = {
         "phi-3-mini": {
             "model_id": "microsoft/Phi-3-mini-4k-instruct",
+            "trust_remote_code": True,
+            "params_b": 3.8,
             "max_memory_gb": 4,
             "quantize": True,
             "description": "Microsoft Phi-3 Mini (3.8B) - Fast and efficient"
         },
         "mistral-7b": {
             "model_id": "mistralai/Mistral-7B-Instruct-v0.3",
+            "params_b": 7,
             "max_memory_gb": 6,
             "quantize": True,
             "description": "Mistral 7B - High quality responses"
         },
+        "mistral-7b-spec": {
+            "model_id": "mistralai/Mistral-7B-Instruct-v0.3",
+            "params_b": 7,
+            "max_memory_gb": 7,
+            "quantize": True,
+            "draft": "tinyllama",
+            "description": "Mistral 7B with TinyLlama speculative decoding - Faster decode"
+        },
         "phi-3-mini-128k": {
             "model_id": "microsoft/Phi-3-mini-128k-instruct",
+            "trust_remote_code": True,
+            "offload_kv_cache": True,
+            "params_b": 3.8,
             "max_memory_gb": 4,
             "quantize": True,
             "description": "Phi-3 Mini with 128k context length"
         },
         "tinyllama": {
             "model_id": "TinyLlama/TinyLlama-1.1B-Chat-v1.0",
+            "params_b": 1.1,
             "max_memory_gb": 2,
             "quantize": False,
             "description": "TinyLlama 1.1B - Ultra lightweight for testing"
+        },
+        "tinyllama-gptq": {
+            "model_id": "TheBloke/TinyLlama-1.1B-Chat-v1.0-GPTQ",
+            "params_b": 1.1,
+            "max_memory_gb": 1,
+            "quantize": False,
+            "description": "TinyLlama 1.1B GPTQ INT4 - Pre-quantized, fused INT4 kernels"
         }
     }
     
-    def __init__(self, model_name: str = "phi-3-mini", cache_dir: Optional[str] = None):
+    # The model table is fixed, so its listing is formatted once
+    SUPPORTED_MODELS_DESCRIPTION = "\n".join(
+        f"   • {name}: {config['description']}" for name, config in SUPPORTED_MODELS.items()
+    )
+    SUPPORTED_MODEL_COUNT = len(SUPPORTED_MODELS)
+    
+    # Checkpoints that ship their own quantization config. Their weight-only INT4
+    # layers run fused dequant+GEMM kernels (ExLlama/AWQ) instead of bitsandbytes'
+    # on-the-fly NF4 dequantization, at the cost of needing a GPTQ/AWQ backend installed.
+    PREQUANTIZED_MARKERS = ("gptq", "awq")
+    
+    # Chat templates as (prefix, suffix) around the user prompt, keyed by model family
+    PROMPT_TEMPLATES = {
+        "phi-3": ("<|user|>\n", "<|end|>\n<|assistant|>\n"),
+        "mistral": ("[INST] ", " [/INST]"),
+        "tinyllama": ("<|system|>\nYou are a helpful assistant.</s>\n<|user|>\n", "</s>\n<|assistant|>\n"),
+    }
+    GENERIC_TEMPLATE = ("User: ", "\nAssistant:")
+    
+    # Chat-template artifacts stripped from responses, and markers where a response should end
+    _STOP_RE = re.compile(r"<\|end\|>|</s>|<\|assistant\|>")
+    _SPLIT_RE = re.compile(r"\n(?:User:|<\|user\|>|\[INST\]|---)")
+    
+    # CPU RAM budget for layers that don't fit on the GPU
+    CPU_MAX_MEMORY = "32GiB"
+    
+    # Compiled models see prompts left-padded up to one of these lengths (and
+    # beyond the largest, to a multiple of it), so captured CUDA graphs are replayed
+    PAD_BUCKETS = (1, 32, 64, 128, 256, 512, 1024)
+    
+    # With a static cache, max_new_tokens is rounded up to a multiple of this so the
+    # cache (prompt + max_new_tokens) matches a captured shape; the requested length
+    # is enforced by a stopping criterion instead
+    NEW_TOKENS_BUCKET = 512
+    
+    # Conversations whose KV cache is kept for prefix reuse; least recently used are dropped
+    MAX_CACHED_CONVERSATIONS = 4
+    
+    # Streamed text kept back so a partially generated stop/split marker is never emitted
+    STREAM_HOLDBACK = 16
+    
+    # Size of the throwaway block used to pre-grow the CUDA caching allocator
+    ALLOCATOR_PREWARM_GB = 1
+    
+    def __init__(
+        self,
+        model_name: str = "phi-3-mini",
+        cache_dir: Optional[str] = None,
+        draft_model_name: Optional[str] = None
+    ):
         """
         Initialize ModelManager.
         
         Args:
             model_name: Name of the model to use (from SUPPORTED_MODELS)
             cache_dir: Directory to cache downloaded models
+            draft_model_name: Optional smaller model (from SUPPORTED_MODELS) used
+                as the draft for speculative decoding; defaults to the preset's draft
         """
-        if not TRANSFORMERS_AVAILABLE:
-            raise ImportError("Transformers library is required. Install with: pip install transformers torch accelerate")
-        
         self.model_name = model_name
-        self.cache_dir = Path(cache_dir) if cache_dir else Path.home() / ".cache" / "encrypted_llm_chat"
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
+        if not _load_backend(self.cache_dir):
+            raise ImportError("Transformers library is required. Install with: pip install transformers torch accelerate")
+        
         if model_name not in self.SUPPORTED_MODELS:
             raise ValueError(f"Unsupported model: {model_name}. Choose from: {list(self.SUPPORTED_MODELS.keys())}")
         
         self.model_config = self.SUPPORTED_MODELS[model_name]
+        
+        self.draft_model_name = draft_model_name or self.model_config.get("draft")
+        if self.draft_model_name is not None and self.draft_model_name not in self.SUPPORTED_MODELS:
+            raise ValueError(f"Unsupported draft model: {self.draft_model_name}. Choose from: {list(self.SUPPORTED_MODELS.keys())}")
+        self.draft_model = None
+        self._draft_manager = None
+        self._assistant_kwargs: Dict[str, Any] = {}
+        
+        # The template never changes for a model, so pick it once
+        self._prompt_prefix, self._prompt_suffix = self._pick_template()
+        self._prefix_ids: List[int] = []
+        self._suffix_ids: List[int] = []
         self.model = None
         self.tokenizer = None
-        self.pipeline = None
+        self._compiled = False
+        self._dtype = None
+        self._copy_stream = None
+        self._cache_mode = "dynamic"
+        
+        # Per-conversation (token_ids, kv_cache) from the last generation, for prefix reuse
+        self._past_kv: "OrderedDict[str, Tuple[Any, Any]]" = OrderedDict()
+        
+        # Device facts don't change for the process; query the driver once
+        self._has_cuda = torch.cuda.is_available()
+        self._gpu_total_gb = (
+            torch.cuda.get_device_properties(0).total_memory / 1024**3 if self._has_cuda else 0.0
+        )
+        self._gpu_capability = torch.cuda.get_device_capability() if self._has_cuda else (0, 0)
         
         # Check system capabilities
         self._check_system_requirements()
     
     def _check_system_requirements(self):
         """Check if system meets requirements for the selected model."""
-        if torch.cuda.is_available():
-            gpu_memory = torch.cuda.get_device_properties(0).total_memory / 1024**3  # GB
+        if self._has_cuda:
+            gpu_memory = self._gpu_total_gb
             required_memory = self.model_config["max_memory_gb"]
             
             print(f"🔍 GPU Memory: {gpu_memory:.1f}GB available, {required_memory}GB required")
@@ -93,6 +279,71 @@ class ModelManager:
         else:
             print("⚠️  CUDA not available. Model will run on CPU (slower).")
     
+    def _compute_dtype(self):
+        """
+        Pick the model dtype for this device.
+        
+        CUDA runs in half precision: bfloat16 on Ampere+ (no FP16 softmax
+        overflow), float16 on older GPUs. CPU never uses float16.
+        Pre-quantized INT4 kernels expect float16 activations.
+        """
+        if not self._has_cuda:
+            return self._pick_cpu_dtype()
+        if self._is_prequantized():
+            return torch.float16
+        if self._gpu_capability[0] >= 8:
+            return torch.bfloat16
+        return torch.float16
+    
+    @staticmethod
+    def _pick_cpu_dtype():
+        """
+        Pick the CPU dtype: bfloat16 when the CPU has native AVX512-BF16 or
+        AMX support (halves memory vs float32), otherwise float32.
+        """
+        capability = torch.backends.cpu.get_cpu_capability()
+        has_bf16 = False
+        for probe in ("_is_avx512_bf16_supported", "_is_amx_tile_supported"):
+            if not has_bf16 and hasattr(torch.cpu, probe):
+                try:
+                    has_bf16 = bool(getattr(torch.cpu, probe)())
+                except RuntimeError:
+                    pass
+        
+        dtype = torch.bfloat16 if has_bf16 else torch.float32
+        print(f"🧮 CPU capability {capability}: using {dtype}")
+        return dtype
+    
+    def _is_prequantized(self) -> bool:
+        """Whether the checkpoint already carries GPTQ/AWQ quantized weights."""
+        model_id = self.model_config["model_id"].lower()
+        return any(marker in model_id for marker in self.PREQUANTIZED_MARKERS)
+    
+    def _should_quantize(self) -> bool:
+        """
+        Decide whether to load with 4-bit NF4 quantization.
+        
+        NF4 weights are dequantized on the fly, which makes small models
+        decode slower than plain FP16. Only quantize when the FP16 weights
+        would not fit in VRAM, or for 7B+ models where the memory savings win.
+        """
+        if not self.model_config["quantize"] or not self._has_cuda:
+            return False
+        
+        # The checkpoint's embedded quantization config is used as-is
+        if self._is_prequantized():
+            return False
+        
+        params_b = self.model_config["params_b"]
+        fp16_gb = params_b * 2 * 1.15  # weights plus ~15% runtime overhead
+        available_gb = self._gpu_total_gb - 1.5  # headroom
+        
+        quantize = fp16_gb > available_gb or params_b >= 7
+        reason = "exceeds" if fp16_gb > available_gb else "fits in"
+        print(f"🔍 FP16 weights need ~{fp16_gb:.1f}GB ({reason} {available_gb:.1f}GB usable VRAM) "
+              f"-> {'NF4 4-bit' if quantize else 'FP16'}")
+        return quantize
+    
     def load_model(self, force_reload: bool = False) -> bool:
         """
         Load the selected model with optimizations.
@@ -111,12 +362,16 @@ class ModelManager:
             model_id = self.model_config["model_id"]
             print(f"🔄 Loading {self.model_name} ({model_id})...")
             
+            # One dtype for weights, 4-bit compute/storage and autocast avoids casts at layer boundaries
+            self._dtype = self._compute_dtype()
+            
             # Configure quantization if needed
             quantization_config = None
-            if self.model_config["quantize"] and torch.cuda.is_available():
+            if self._should_quantize():
                 quantization_config = BitsAndBytesConfig(
                     load_in_4bit=True,
-                    bnb_4bit_compute_dtype=torch.float16,
+                    bnb_4bit_compute_dtype=self._dtype,
+                    bnb_4bit_quant_storage=self._dtype,
                     bnb_4bit_use_double_quant=True,
                     bnb_4bit_quant_type="nf4"
                 )
@@ -124,38 +379,78 @@ class ModelManager:
             
             # Load tokenizer
             print("📝 Loading tokenizer...")
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                model_id,
-                cache_dir=self.cache_dir,
-                trust_remote_code=True
-            )
+            trust_remote_code = self.model_config.get("trust_remote_code", False)
+            try:
+                self.tokenizer = AutoTokenizer.from_pretrained(
+                    model_id,
+                    cache_dir=self.cache_dir,
+                    trust_remote_code=trust_remote_code,
+                    use_fast=True
+                )
+            except ValueError:
+                print("⚠️  No fast tokenizer available, using the slow one")
+                self.tokenizer = AutoTokenizer.from_pretrained(
+                    model_id,
+                    cache_dir=self.cache_dir,
+                    trust_remote_code=trust_remote_code,
+                    use_fast=False
+                )
             
             # Ensure pad token exists
             if self.tokenizer.pad_token is None:
                 self.tokenizer.pad_token = self.tokenizer.eos_token
             
+            # Tokenize the fixed template once instead of on every request
+            self._prefix_ids = self.tokenizer(self._prompt_prefix).input_ids
+            self._suffix_ids = self.tokenizer(self._prompt_suffix, add_special_tokens=False).input_ids
+            
             # Load model
             print("🧠 Loading model...")
-            device_map = "auto" if torch.cuda.is_available() else "cpu"
+            device_map = "auto" if self._has_cuda else "cpu"
+            max_memory = self._max_memory()
             
-            self.model = AutoModelForCausalLM.from_pretrained(
+            self.model = self._from_pretrained_with_attention(
                 model_id,
                 cache_dir=self.cache_dir,
                 quantization_config=quantization_config,
                 device_map=device_map,
-                torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-                trust_remote_code=True,
+                max_memory=max_memory,
+                torch_dtype=self._dtype,
+                trust_remote_code=trust_remote_code,
                 low_cpu_mem_usage=True
             )
             
-            # Create pipeline for easier inference
-            self.pipeline = pipeline(
-                "text-generation",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                device_map=device_map,
-                torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32
-            )
+            # Compile the forward pass so decode steps run as fused kernels replayed from CUDA graphs
+            self._compiled = False
+            if self._has_cuda and hasattr(torch, "compile"):
+                self.model.forward = torch.compile(
+                    self.model.forward,
+                    mode="reduce-overhead",
+                    fullgraph=False
+                )
+                self._compiled = True
+                print("⚡ Compiled model forward (torch.compile, reduce-overhead)")
+            
+            # Side stream for host-to-device prompt copies, so they overlap with earlier work
+            if self._has_cuda:
+                self._copy_stream = torch.cuda.Stream()
+            
+            if self.draft_model_name is not None:
+                self._load_draft_model()
+            
+            self._cache_mode = self._pick_cache_mode()
+            if self._cache_mode == "static":
+                # Preallocated KV buffers sized per call (prompt + max_new_tokens):
+                # no allocator calls while decoding, and fixed shapes for graph replay
+                self.model.generation_config.cache_implementation = "static"
+            print(f"🗄️  KV cache: {self._cache_mode}")
+            
+            # Capture the compiled graphs for every bucketed shape up front
+            if self._compiled:
+                self._capture_buckets()
+            
+            # Pay kernel selection, compile and allocator costs before the first user prompt
+            self.warmup()
             
             print(f"✅ Successfully loaded {self.model_name}")
             return True
@@ -164,13 +459,84 @@ class ModelManager:
             print(f"❌ Failed to load model {self.model_name}: {e}")
             return False
     
+    def _max_memory(self) -> Optional[Dict[Any, str]]:
+        """
+        Explicit per-device memory budget for device_map="auto", so accelerate
+        doesn't probe device memory itself. GPU keeps 1GiB of headroom.
+        """
+        if not self._has_cuda:
+            return None
+        return {0: f"{max(int(self._gpu_total_gb - 1), 1)}GiB", "cpu": self.CPU_MAX_MEMORY}
+    
+    def _attention_backends(self) -> List[str]:
+        """Attention implementations to try, fastest first."""
+        backends = []
+        # FlashAttention-2 kernels need CUDA, a half-precision dtype and Ampere+
+        if (FLASH_ATTN_AVAILABLE and self._has_cuda
+                and self._dtype in (torch.float16, torch.bfloat16)
+                and self._gpu_capability[0] >= 8):
+            backends.append("flash_attention_2")
+        backends.extend(["sdpa", "eager"])
+        return backends
+    
+    def _from_pretrained_with_attention(self, model_id: str, **kwargs):
+        """
+        Load the model with a fused attention backend when available.
+        
+        Falls back through the candidates in _attention_backends; older
+        Transformers or unsupported architectures end up on eager attention.
+        """
+        backends = self._attention_backends()
+        for backend in backends:
+            try:
+                model = AutoModelForCausalLM.from_pretrained(
+                    model_id,
+                    attn_implementation=backend,
+                    **kwargs
+                )
+                print(f"🎯 Attention backend: {backend}")
+                return model
+            except (ValueError, ImportError, TypeError) as e:
+                if backend == backends[-1]:
+                    raise
+                print(f"⚠️  {backend} attention unavailable ({e}), trying fallback")
+    
+    def _load_draft_model(self):
+        """
+        Load the draft model used for speculative decoding.
+        
+        The draft proposes a few tokens per step that the target model then
+        verifies in a single forward pass. A draft that fails to load only
+        disables speculation; the target model still works on its own.
+        """
+        print(f"🏃 Loading draft model {self.draft_model_name} for speculative decoding...")
+        self._draft_manager = ModelManager(self.draft_model_name, cache_dir=str(self.cache_dir))
+        if not self._draft_manager.load_model():
+            print("⚠️  Draft model unavailable, continuing without speculative decoding")
+            self._draft_manager = None
+            return
+        
+        self.draft_model = self._draft_manager.model
+        self._assistant_kwargs = {
+            "assistant_model": self.draft_model,
+            "num_assistant_tokens": 5
+        }
+        
+        # Different vocabularies need both tokenizers so candidates can be re-encoded
+        if self._draft_manager.tokenizer.get_vocab() != self.tokenizer.get_vocab():
+            self._assistant_kwargs["tokenizer"] = self.tokenizer
+            self._assistant_kwargs["assistant_tokenizer"] = self._draft_manager.tokenizer
+        
+        print(f"✅ Speculative decoding enabled with {self.draft_model_name}")
+    
     def generate_response(
         self, 
         prompt: str, 
         max_length: int = 512,
         temperature: float = 0.7,
         top_p: float = 0.9,
-        do_sample: bool = True
+        do_sample: bool = True,
+        conversation_id: Optional[str] = None
     ) -> str:
         """
         Generate a response to the given prompt.
@@ -181,67 +547,551 @@ class ModelManager:
             temperature: Sampling temperature (0.0 = deterministic)
             top_p: Top-p sampling parameter
             do_sample: Whether to use sampling
+            conversation_id: Optional key for reusing the KV cache of earlier turns
             
         Returns:
             Generated response text
         """
-        if self.pipeline is None:
+        return "".join(self.generate_response_stream(
+            prompt,
+            max_length=max_length,
+            temperature=temperature,
+            top_p=top_p,
+            do_sample=do_sample,
+            conversation_id=conversation_id
+        ))
+    
+    def generate_response_stream(
+        self,
+        prompt: str,
+        max_length: int = 512,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        do_sample: bool = True,
+        conversation_id: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Generate a response, yielding text as tokens are produced.
+        
+        Generation runs in a background thread feeding a TextIteratorStreamer.
+        The tail of the text is held back until it cannot be the start of a
+        stop marker, so the concatenated chunks equal the cleaned response.
+        Closing the generator early stops generation.
+        
+        Args:
+            prompt: Input prompt
+            max_length: Maximum response length
+            temperature: Sampling temperature (0.0 = deterministic)
+            top_p: Top-p sampling parameter
+            do_sample: Whether to use sampling
+            conversation_id: Optional key for reusing the KV cache of earlier turns
+            
+        Yields:
+            Successive pieces of the response text
+        """
+        if self.model is None:
             if not self.load_model():
-                return "❌ Error: Model not loaded"
+                yield "❌ Error: Model not loaded"
+                return
         
         try:
-            # Format prompt based on model type
-            formatted_prompt = self._format_prompt(prompt)
-            
-            # Generate response
-            outputs = self.pipeline(
-                formatted_prompt,
-                max_new_tokens=max_length,
-                temperature=temperature,
-                top_p=top_p,
-                do_sample=do_sample,
-                pad_token_id=self.tokenizer.eos_token_id,
-                return_full_text=False  # Only return new tokens
-            )
+            # Format and tokenize prompt based on model type
+            inputs = self._to_device(self._encode_prompt(prompt))
             
-            response = outputs[0]['generated_text'].strip()
+            # Reuse the KV cache of the shared prefix with this conversation's last turn
+            # (not with a draft model, whose own cache would be out of sync)
+            past_key_values = None
+            if self._reuses_kv_cache():
+                past_key_values = self._reusable_kv_cache(conversation_id, inputs.input_ids)
+            reused = past_key_values is not None
             
-            # Clean up response
-            response = self._clean_response(response)
+            if past_key_values is None and self._cache_mode == "offloaded":
+                past_key_values = OffloadedCache()
             
-            return response
+            # Stable input shapes let the compiled graphs be replayed instead of recaptured
+            if self._compiled and not reused:
+                inputs["input_ids"], inputs["attention_mask"] = self._bucket_pad(
+                    inputs["input_ids"], inputs["attention_mask"]
+                )
             
+            streamer = TextIteratorStreamer(
+                self.tokenizer,
+                skip_prompt=True,
+                skip_special_tokens=True
+            )
         except Exception as e:
             print(f"❌ Generation error: {e}")
-            return f"❌ Error generating response: {str(e)}"
+            yield f"❌ Error generating response: {str(e)}"
+            return
+        
+        stop_event = threading.Event()
+        result: Dict[str, Any] = {}
+        
+        def run_generate():
+            try:
+                # Generate response (autocast only on CUDA; it slows down CPU/MPS).
+                # Both contexts are thread-local, so they are entered here.
+                with torch.inference_mode(), torch.autocast(
+                    device_type="cuda",
+                    dtype=self._dtype,
+                    enabled=self._has_cuda
+                ):
+                    result["outputs"] = self.model.generate(
+                        **inputs,
+                        streamer=streamer,
+                        **self._generate_kwargs(
+                            inputs["input_ids"].shape[-1], max_length, temperature, top_p,
+                            do_sample, past_key_values, stop_event
+                        )
+                    )
+            except Exception as e:
+                result["error"] = e
+                streamer.end()
+        
+        thread = threading.Thread(target=run_generate, daemon=True)
+        thread.start()
+        
+        text = ""
+        emitted = 0
+        try:
+            for new_text in streamer:
+                text += new_text
+                cleaned = self._STOP_RE.sub("", text)
+                
+                # A stop pattern ends the response; stop generating past it
+                match = self._SPLIT_RE.search(cleaned)
+                if match:
+                    break
+                
+                # Hold back a tail that could still turn into a stop marker
+                visible = cleaned[:max(0, len(cleaned) - self.STREAM_HOLDBACK)].strip()
+                if len(visible) > emitted:
+                    yield visible[emitted:]
+                    emitted = len(visible)
+            
+            if "error" in result:
+                print(f"❌ Generation error: {result['error']}")
+                if not emitted:
+                    yield f"❌ Error generating response: {str(result['error'])}"
+                return
+            
+            # Flush whatever was held back, cleaned the same way as a full response
+            response = self._clean_response(text)
+            if len(response) > emitted:
+                yield response[emitted:]
+        finally:
+            stop_event.set()
+            thread.join()
+            
+            outputs = result.get("outputs")
+            if outputs is not None and conversation_id is not None and self._reuses_kv_cache():
+                self._store_kv_cache(conversation_id, outputs.sequences[0], outputs.past_key_values)
+    
+    def generate_batch(
+        self,
+        prompts: List[str],
+        max_length: int = 512,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        do_sample: bool = True
+    ) -> List[str]:
+        """
+        Generate responses to several prompts with a single generate call.
+        
+        Prompts are left-padded to a common length (decoder-only models
+        continue from the last position) and masked via attention_mask.
+        
+        Args:
+            prompts: Input prompts
+            max_length: Maximum response length
+            temperature: Sampling temperature (0.0 = deterministic)
+            top_p: Top-p sampling parameter
+            do_sample: Whether to use sampling
+            
+        Returns:
+            Generated response texts, in prompt order
+        """
+        if not prompts:
+            return []
+        
+        if self.model is None:
+            if not self.load_model():
+                return ["❌ Error: Model not loaded"] * len(prompts)
+        
+        try:
+            rows = [self._prompt_ids(prompt) for prompt in prompts]
+            width = max(len(ids) for ids in rows)
+            pad_id = self.tokenizer.pad_token_id
+            inputs = BatchEncoding(
+                {
+                    "input_ids": [[pad_id] * (width - len(ids)) + ids for ids in rows],
+                    "attention_mask": [[0] * (width - len(ids)) + [1] * len(ids) for ids in rows]
+                },
+                tensor_type="pt"
+            )
+            inputs = self._to_device(inputs)
+            
+            if self._compiled:
+                inputs["input_ids"], inputs["attention_mask"] = self._bucket_pad(
+                    inputs["input_ids"], inputs["attention_mask"]
+                )
+            
+            # Assisted (speculative) generation only supports a batch of one
+            with torch.inference_mode(), torch.autocast(
+                device_type="cuda",
+                dtype=self._dtype,
+                enabled=self._has_cuda
+            ):
+                outputs = self.model.generate(
+                    **inputs,
+                    max_new_tokens=max_length,
+                    temperature=temperature,
+                    top_p=top_p,
+                    do_sample=do_sample,
+                    use_cache=True,
+                    pad_token_id=self.tokenizer.pad_token_id
+                )
+            
+            # Only decode the newly generated tokens
+            responses = self.tokenizer.batch_decode(
+                outputs[:, inputs.input_ids.shape[1]:],
+                skip_special_tokens=True
+            )
+            return [self._clean_response(response) for response in responses]
+            
+        except Exception as e:
+            print(f"❌ Batch generation error: {e}")
+            return [f"❌ Error generating response: {str(e)}"] * len(prompts)
+    
+    def generate_candidates(
+        self,
+        prompt: str,
+        n: int = 4,
+        max_length: int = 512,
+        temperature: float = 0.7,
+        top_p: float = 0.9
+    ) -> List[str]:
+        """
+        Sample several alternative responses to one prompt in a single generate call.
+        
+        The prompt is prefilled once and its KV cache expanded across the n
+        sequences, so candidates cost far less than n separate generations.
+        
+        Args:
+            prompt: Input prompt
+            n: Number of candidates
+            max_length: Maximum response length
+            temperature: Sampling temperature
+            top_p: Top-p sampling parameter
+            
+        Returns:
+            Generated candidate texts
+        """
+        if self.model is None:
+            if not self.load_model():
+                return ["❌ Error: Model not loaded"]
+        
+        try:
+            inputs = self._to_device(self._encode_prompt(prompt))
+            
+            if self._compiled:
+                inputs["input_ids"], inputs["attention_mask"] = self._bucket_pad(
+                    inputs["input_ids"], inputs["attention_mask"]
+                )
+            
+            with torch.inference_mode(), torch.autocast(
+                device_type="cuda",
+                dtype=self._dtype,
+                enabled=self._has_cuda
+            ):
+                outputs = self.model.generate(
+                    **inputs,
+                    max_new_tokens=max_length,
+                    temperature=temperature,
+                    top_p=top_p,
+                    do_sample=True,
+                    num_return_sequences=n,
+                    use_cache=True,
+                    pad_token_id=self.tokenizer.eos_token_id
+                )
+            
+            # Only decode the newly generated tokens
+            candidates = self.tokenizer.batch_decode(
+                outputs[:, inputs.input_ids.shape[1]:],
+                skip_special_tokens=True
+            )
+            return [self._clean_response(candidate) for candidate in candidates]
+            
+        except Exception as e:
+            print(f"❌ Candidate generation error: {e}")
+            return [f"❌ Error generating response: {str(e)}"]
+    
+    def warmup(self, runs: int = 2) -> bool:
+        """
+        Run throwaway generations so first-call costs are paid up front.
+        
+        The first forward passes trigger kernel selection, cuBLAS workspace
+        allocation, torch.compile and lazy initialization; load_model runs
+        this so that latency stays off the first real request. On CUDA the
+        caching allocator is also pre-sized with one large block.
+        
+        Args:
+            runs: Number of warmup generations
+            
+        Returns:
+            True if warmup completed, False otherwise
+        """
+        if self.model is None:
+            return False
+        
+        try:
+            # Use the model's real prompt template so the static prefix is exercised
+            inputs = self._to_device(self._encode_prompt("Hello"))
+            
+            with torch.inference_mode():
+                for _ in range(runs):
+                    # A few new tokens so the decode step is exercised, not just prefill
+                    self.model.generate(
+                        **inputs,
+                        max_new_tokens=4,
+                        do_sample=False,
+                        pad_token_id=self.tokenizer.eos_token_id,
+                        **self._assistant_kwargs
+                    )
+            
+            if self._has_cuda:
+                torch.cuda.synchronize()
+                self._prewarm_allocator()
+            
+            print("🔥 Model warmed up")
+            return True
+            
+        except Exception as e:
+            print(f"⚠️  Warmup failed: {e}")
+            return False
+    
+    def _prewarm_allocator(self):
+        """Grow the CUDA caching allocator with one block, if it fits, to limit fragmentation."""
+        torch.cuda.empty_cache()
+        free_bytes, _ = torch.cuda.mem_get_info()
+        block_bytes = int(self.ALLOCATOR_PREWARM_GB * 1024**3)
+        if free_bytes < 2 * block_bytes:
+            return
+        
+        # Freed memory stays reserved by the allocator for later requests
+        block = torch.empty(block_bytes, dtype=torch.uint8, device="cuda")
+        del block
+    
+    def _to_device(self, inputs: "BatchEncoding") -> "BatchEncoding":
+        """
+        Move tokenized inputs to the model's device.
+        
+        On CUDA the tensors are pinned and copied asynchronously on a side
+        stream; the current stream waits on that copy before using them.
+        """
+        if self._copy_stream is None or self.model.device.type != "cuda":
+            return inputs.to(self.model.device)
+        
+        with torch.cuda.stream(self._copy_stream):
+            moved = {
+                key: tensor.pin_memory().to(self.model.device, non_blocking=True)
+                for key, tensor in inputs.items()
+            }
+        
+        current = torch.cuda.current_stream()
+        current.wait_stream(self._copy_stream)
+        for tensor in moved.values():
+            # Keep the allocator from reusing this memory while the copy stream still owns it
+            tensor.record_stream(current)
+        
+        return BatchEncoding(moved)
+    
+    def _pick_cache_mode(self) -> str:
+        """
+        Choose the KV cache layout for generation.
+        
+        Long-context models keep their KV cache in CPU memory, prefetching one
+        layer at a time. Compiled models without a draft use a static cache.
+        Everything else uses the default dynamic cache, which also allows
+        reusing a conversation's earlier turns.
+        """
+        if self.model_config.get("offload_kv_cache") and self._has_cuda and OffloadedCache is not None:
+            return "offloaded"
+        if self._compiled and self.draft_model is None:
+            return "static"
+        return "dynamic"
+    
+    def _generate_kwargs(
+        self,
+        prompt_length: int,
+        max_length: int,
+        temperature: float,
+        top_p: float,
+        do_sample: bool,
+        past_key_values,
+        stop_event: threading.Event
+    ) -> Dict[str, Any]:
+        """
+        Keyword arguments for model.generate shared by real requests and graph capture.
+        
+        Keeping one source means capture compiles with the same cache, sampling
+        and stopping setup, so its graphs and guards are reused afterwards.
+        """
+        stopping_criteria = [_EventStoppingCriteria(stop_event)]
+        max_new_tokens = max_length
+        if self._cache_mode == "static":
+            max_new_tokens = -(-max_length // self.NEW_TOKENS_BUCKET) * self.NEW_TOKENS_BUCKET
+            if max_new_tokens != max_length:
+                stopping_criteria.append(_TokenBudgetCriteria(prompt_length, max_length))
+        
+        return {
+            "max_new_tokens": max_new_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+            "do_sample": do_sample,
+            "use_cache": True,
+            "past_key_values": past_key_values,
+            "pad_token_id": self.tokenizer.eos_token_id,
+            "return_dict_in_generate": True,
+            "stopping_criteria": StoppingCriteriaList(stopping_criteria),
+            **self._assistant_kwargs
+        }
+    
+    def _capture_buckets(self, max_length: int = 300, temperature: float = 0.7, top_p: float = 0.9):
+        """
+        Run generate once per PAD_BUCKETS length to compile and capture its graphs.
+        
+        Uses the same kwargs as generate_response, with the UIs' default
+        length; _generate_kwargs rounds it to NEW_TOKENS_BUCKET, so every
+        request up to that length gets the captured static cache shape. The
+        stop event is already set, so each capture covers prefill and one
+        decode step.
+        """
+        print(f"📸 Capturing compiled graphs for {len(self.PAD_BUCKETS)} prompt lengths...")
+        stop_event = threading.Event()
+        stop_event.set()
+        try:
+            with torch.inference_mode(), torch.autocast(
+                device_type="cuda",
+                dtype=self._dtype,
+                enabled=self._has_cuda
+            ):
+                for length in self.PAD_BUCKETS:
+                    input_ids = torch.full(
+                        (1, length),
+                        self.tokenizer.pad_token_id,
+                        dtype=torch.long,
+                        device=self.model.device
+                    )
+                    past_key_values = OffloadedCache() if self._cache_mode == "offloaded" else None
+                    self.model.generate(
+                        input_ids=input_ids,
+                        attention_mask=torch.ones_like(input_ids),
+                        **self._generate_kwargs(
+                            length, max_length, temperature, top_p, True, past_key_values, stop_event
+                        )
+                    )
+            torch.cuda.synchronize()
+        except Exception as e:
+            print(f"⚠️  Graph capture failed: {e}")
+    
+    def _bucket_length(self, length: int) -> int:
+        """Smallest PAD_BUCKETS length that fits, or a multiple of the largest."""
+        for bucket in self.PAD_BUCKETS:
+            if length <= bucket:
+                return bucket
+        largest = self.PAD_BUCKETS[-1]
+        return -(-length // largest) * largest
+    
+    def _bucket_pad(self, input_ids, attention_mask):
+        """Left-pad inputs up to the next PAD_BUCKETS length."""
+        length = input_ids.shape[-1]
+        pad = self._bucket_length(length) - length
+        if pad == 0:
+            return input_ids, attention_mask
+        
+        pad_ids = input_ids.new_full((input_ids.shape[0], pad), self.tokenizer.pad_token_id)
+        pad_mask = attention_mask.new_zeros((attention_mask.shape[0], pad))
+        return torch.cat([pad_ids, input_ids], dim=-1), torch.cat([pad_mask, attention_mask], dim=-1)
+    
+    def _reuses_kv_cache(self) -> bool:
+        """Whether KV caches can carry over between turns (not static, no draft model)."""
+        return self.draft_model is None and self._cache_mode != "static"
+    
+    def _reusable_kv_cache(self, conversation_id: Optional[str], input_ids):
+        """
+        Return this conversation's cached KV state trimmed to the prefix it
+        shares with input_ids, or None if nothing can be reused.
+        """
+        if conversation_id is None or conversation_id not in self._past_kv:
+            return None
+        
+        cached_ids, cache = self._past_kv.pop(conversation_id)
+        if not hasattr(cache, "crop"):
+            # Legacy tuple caches can't be trimmed to a shared prefix
+            return None
+        
+        # Leave at least one prompt token for the forward pass
+        n = min(cached_ids.shape[-1], input_ids.shape[-1] - 1)
+        if n <= 0:
+            return None
+        
+        mismatch = (cached_ids[:n] != input_ids[0, :n]).nonzero()
+        prefix_len = int(mismatch[0]) if len(mismatch) else n
+        if prefix_len == 0:
+            return None
+        
+        cache.crop(prefix_len)
+        return cache
+    
+    def _store_kv_cache(self, conversation_id: str, sequence, cache):
+        """Remember the KV cache of the last generation for a conversation."""
+        if cache is None or not hasattr(cache, "get_seq_length"):
+            return
+        
+        # The cache covers every token except the last one sampled
+        cached_len = cache.get_seq_length()
+        self._past_kv[conversation_id] = (sequence[:cached_len], cache)
+        self._past_kv.move_to_end(conversation_id)
+        
+        # Abandoned sessions would otherwise pin their GPU KV tensors forever
+        while len(self._past_kv) > self.MAX_CACHED_CONVERSATIONS:
+            self._past_kv.popitem(last=False)
+    
+    def _pick_template(self) -> Tuple[str, str]:
+        """Select the chat template matching this model's family."""
+        name = self.model_name.lower()
+        for family, template in self.PROMPT_TEMPLATES.items():
+            if family in name:
+                return template
+        return self.GENERIC_TEMPLATE
     
     def _format_prompt(self, prompt: str) -> str:
         """Format prompt according to model's expected format."""
-        if "phi-3" in self.model_name.lower():
-            # Phi-3 chat format
-            return f"<|user|>\n{prompt}<|end|>\n<|assistant|>\n"
-        elif "mistral" in self.model_name.lower():
-            # Mistral instruct format
-            return f"[INST] {prompt} [/INST]"
-        elif "tinyllama" in self.model_name.lower():
-            # TinyLlama chat format
-            return f"<|system|>\nYou are a helpful assistant.</s>\n<|user|>\n{prompt}</s>\n<|assistant|>\n"
-        else:
-            # Generic format
-            return f"User: {prompt}\nAssistant:"
+        return self._prompt_prefix + prompt + self._prompt_suffix
+    
+    def _prompt_ids(self, prompt: str) -> List[int]:
+        """Token ids of a formatted prompt, splicing in the pre-tokenized template ids."""
+        body_ids = self.tokenizer(prompt, add_special_tokens=False).input_ids
+        return self._prefix_ids + body_ids + self._suffix_ids
+    
+    def _encode_prompt(self, prompt: str) -> "BatchEncoding":
+        """Tokenize a single prompt into a batch of one."""
+        input_ids = self._prompt_ids(prompt)
+        return BatchEncoding(
+            {"input_ids": [input_ids], "attention_mask": [[1] * len(input_ids)]},
+            tensor_type="pt"
+        )
     
     def _clean_response(self, response: str) -> str:
         """Clean up model response."""
         # Remove common artifacts
-        response = response.replace("<|end|>", "")
-        response = response.replace("</s>", "")
-        response = response.replace("<|assistant|>", "")
+        response = self._STOP_RE.sub("", response)
         
-        # Split on common stop patterns and take first part
-        stop_patterns = ["\nUser:", "\n<|user|>", "\n[INST]", "\n---"]
-        for pattern in stop_patterns:
-            if pattern in response:
-                response = response.split(pattern)[0]
+        # Cut at the first stop pattern
+        match = self._SPLIT_RE.search(response)
+        if match:
+            response = response[:match.start()]
         
         return response.strip()
     
@@ -254,14 +1104,20 @@ class ModelManager:
         if self.tokenizer is not None:
             del self.tokenizer  
             self.tokenizer = None
-            
-        if self.pipeline is not None:
-            del self.pipeline
-            self.pipeline = None
+        
+        self._past_kv.clear()
+        self._copy_stream = None
+        self._cache_mode = "dynamic"
+        
+        if self._draft_manager is not None:
+            self._draft_manager.unload_model()
+            self._draft_manager = None
+        self.draft_model = None
+        self._assistant_kwargs = {}
         
         # Force garbage collection
         gc.collect()
-        if torch.cuda.is_available():
+        if self._has_cuda:
             torch.cuda.empty_cache()
         
         print(f"🗑️  Unloaded {self.model_name}")
@@ -271,10 +1127,11 @@ class ModelManager:
         config = self.model_config.copy()
         config["loaded"] = self.model is not None
         config["model_name"] = self.model_name
+        config["draft_model"] = self.draft_model_name
         
-        if torch.cuda.is_available():
+        if self._has_cuda:
             config["gpu_available"] = True
-            config["gpu_memory_gb"] = torch.cuda.get_device_properties(0).total_memory / 1024**3
+            config["gpu_memory_gb"] = self._gpu_total_gb
         else:
             config["gpu_available"] = False
             config["gpu_memory_gb"] = 0
@@ -320,9 +1177,9 @@ def main():
         ]
         
         print(f"\n🧪 Testing inference:")
-        for prompt in test_prompts:
+        responses = manager.generate_batch(test_prompts, max_length=100)
+        for prompt, response in zip(test_prompts, responses):
             print(f"\n👤 Prompt: {prompt}")
-            response = manager.generate_response(prompt, max_length=100)
             print(f"🤖 Response: {response}")
         
         # Unload model
@@ -10,47 +10,162 @@ Alternative web interface using Gradio with:
 """
 
 import gradio as gr
+import numpy as np
+import asyncio
+import functools
+import os
+import threading
 import time
 import json
-from datetime import datetime
-from typing import List, Tuple, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from typing import List, Tuple, Dict, Any, AsyncIterator, Optional
 import sys
 sys.path.append('.')
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 try:
     from llm.encrypted_llm import EncryptedLLM
-    from llm.model_manager import ModelManager
+    from llm.model_manager import ModelManager, _load_backend
     from crypto.key_manager import KeyManager
     COMPONENTS_AVAILABLE = True
+    
+    # Shared across re-initializations; parsed keys are cached per file and mtime
+    _KEY_MANAGER = KeyManager()
 except ImportError as e:
     COMPONENTS_AVAILABLE = False
     print(f"Components not available: {e}")
 
 
+# Served as a static file so browsers cache it across reloads
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+CSS_PATH = os.path.join(STATIC_DIR, "app.css")
+
+# Markdown templates reused on every stats refresh / reply
+STATS_TMPL = (
+    "\n📊 **Session Statistics**\n"
+    "- Messages: {m}\n"
+    "- Avg Generation Time: {a:.2f}s\n"
+    "- Encryptions: {e}\n"
+    "- Total Gen Time: {t:.1f}s\n"
+    "- p95 Generation Time: {p95:.2f}s\n"
+    "- Avg Encrypt / Decrypt: {enc:.1f} / {dec:.1f} ms\n"
+)
+STATUS_TMPL = "✅ Response generated in {total:.2f}s (Generation: {gen:.2f}s)"
+
+
+class _UpdateThrottle:
+    """
+    Decides when a streamed chunk is worth re-rendering in the browser.
+    
+    The first chunk is sent right away. After that the batch size grows
+    geometrically (1, 3, 9, ... up to max_batch), and an update also goes out
+    once `interval` seconds have passed since the last one. Early tokens
+    appear immediately, while steady-state streaming is coalesced into
+    roughly 20 updates per second.
+    """
+    
+    def __init__(self, interval: float = 0.05, growth: int = 3, max_batch: int = 50):
+        self.interval = interval
+        self.growth = growth
+        self.max_batch = max_batch
+        self.batch = 1
+        self.pending = 0
+        self.last_emit = 0.0
+    
+    def ready(self) -> bool:
+        """Record one chunk; return True if an update should be emitted now."""
+        self.pending += 1
+        now = time.monotonic()
+        if self.pending < self.batch and now - self.last_emit < self.interval:
+            return False
+        
+        self.pending = 0
+        self.last_emit = now
+        self.batch = min(self.batch * self.growth, self.max_batch)
+        return True
+
+
+@dataclass(slots=True)
+class ChatStats:
+    """Running counters for the current session."""
+    total_messages: int = 0
+    total_generation_time: float = 0.0
+    encryption_count: int = 0
+
+
 class GradioEncryptedChat:
     """Gradio interface for encrypted LLM chat."""
     
+    # Alternatives sampled in one batch when regenerating a reply
+    N_CANDIDATES = 4
+    
+    # Most recent per-message timings kept for the stats panel
+    TIMING_WINDOW = 1024
+    
+    # Identical messages re-submitted within this many seconds are dropped
+    DUPLICATE_WINDOW = 0.5
+    
     def __init__(self):
         """Initialize the Gradio chat interface."""
         self.encrypted_llm = None
         self.model_loaded = False
-        self.chat_history = []
-        self.stats = {
-            'total_messages': 0,
-            'total_generation_time': 0.0,
-            'encryption_count': 0
-        }
+        
+        # Bumped by Initialize, so per-browser AES session caches made with the old keys are dropped
+        self._key_epoch = 0
+        
+        # Crypto runs here rather than on the event loop; OpenSSL releases the GIL
+        self._crypto_pool = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="crypto")
+        
+        # Static part of the metadata sent with every encrypted prompt
+        self._meta_template = {"user_id": "gradio_user", "interface": "gradio"}
+        
+        # Model details stamped into exports, set once per successful initialization
+        self._export_meta = {"encryption_type": "unknown", "model_name": "unknown"}
+        self.stats = ChatStats()
+        
+        # Ring buffer of [generation_s, encrypt_ms, decrypt_ms] rows, one per message
+        self._timings = np.zeros((self.TIMING_WINDOW, 3), dtype=np.float64)
+        self._timing_count = 0
+        
+        # (stats snapshot, rendered Markdown) from the last get_stats call
+        self._stats_cache: Optional[Tuple[Tuple, str]] = None
+        
+        # Parse whichever key pairs already exist so the first Initialize is quick
+        if COMPONENTS_AVAILABLE:
+            for key_type in ("rsa", "ecc"):
+                try:
+                    self._get_key(key_type, "user")
+                    self._get_key(key_type, "model")
+                except FileNotFoundError:
+                    pass
+    
+    @staticmethod
+    def _get_key(key_type: str, role: str):
+        """Load a private key through the shared, file-change-aware key cache."""
+        return _KEY_MANAGER.load_private_key(f"{role}_{key_type}_private_key.pem")
+    
+    def _crypto_sessions(self, session: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """This browser session's (user side, model side) AES session-key caches."""
+        if session.get("key_epoch") != self._key_epoch:
+            session.update(key_epoch=self._key_epoch, client_crypto={}, model_crypto={})
+        return session["client_crypto"], session["model_crypto"]
     
     def initialize_model(self, model_name: str, encryption_type: str) -> str:
         """Initialize the encrypted LLM model."""
         try:
             # Check certificates
-            key_manager = KeyManager()
             key_type = encryption_type.lower().split('-')[0]
             
             try:
-                key_manager.load_private_key(f"user_{key_type}_private_key.pem")
-                key_manager.load_private_key(f"model_{key_type}_private_key.pem")
+                self._get_key(key_type, "user")
+                self._get_key(key_type, "model")
             except FileNotFoundError:
                 return f"❌ Missing {key_type.upper()} certificates! Run: python crypto/generate_certs.py {'--ecc' if key_type == 'ecc' else ''}"
             
@@ -61,7 +176,13 @@ class GradioEncryptedChat:
             )
             
             if self.encrypted_llm.initialize_model():
+                self.encrypted_llm.prewarm_crypto()
                 self.model_loaded = True
+                self._export_meta = {
+                    "encryption_type": self.encrypted_llm.key_type,
+                    "model_name": self.encrypted_llm.model_name
+                }
+                self._key_epoch += 1
                 return f"✅ {model_name} initialized with {encryption_type} encryption!"
             else:
                 return "❌ Failed to initialize model"
@@ -69,116 +190,289 @@ class GradioEncryptedChat:
         except Exception as e:
             return f"❌ Initialization failed: {str(e)}"
     
-    def chat_with_llm(
+    async def chat_with_llm(
         self, 
         message: str, 
-        history: List[List[str]], 
-        max_length: int = 300,
-        temperature: float = 0.7,
-        top_p: float = 0.9
-    ) -> Tuple[str, List[List[str]], str]:
-        """Process a chat message through encrypted LLM."""
+        history: List[Dict[str, str]], 
+        gen_params: Dict[str, Any],
+        last_req: Optional[Tuple[int, float]],
+        session: Dict[str, Any]
+    ) -> AsyncIterator[Tuple[str, List[Dict[str, str]], str, Optional[Tuple[int, float]], Dict[str, Any]]]:
+        """Process a chat message through encrypted LLM, streaming the reply into the chat.
+        
+        last_req is this session's (message hash, monotonic time) of the last
+        dispatched message, used to drop duplicate submits. session is the
+        browser session's own state: its AES session-key caches and the
+        Regenerate candidates.
+        """
+        
+        loop = asyncio.get_running_loop()
         
         if not self.encrypted_llm or not self.model_loaded:
-            return "", history, "❌ Please initialize the model first!"
+            yield "", history, "❌ Please initialize the model first!", last_req, session
+            return
         
         if not message.strip():
-            return "", history, "Please enter a message."
+            yield "", history, "Please enter a message.", last_req, session
+            return
+        
+        # Drop double-clicks and retried submits before they cost a generation
+        key = hash(message)
+        now = time.monotonic()
+        if last_req is not None and last_req[0] == key and now - last_req[1] < self.DUPLICATE_WINDOW:
+            yield "", history, "⏳ Duplicate message suppressed", last_req, session
+            return
+        last_req = (key, now)
+        client_session, model_session = self._crypto_sessions(session)
         
         try:
-            # Show encryption status
-            status = "🔐 Encrypting message..."
-            
             # Encrypt the message
             start_time = time.time()
-            encrypted_prompt = self.encrypted_llm.crypto.encrypt_message(
+            crypto_start = time.perf_counter()
+            encrypted_prompt = await loop.run_in_executor(self._crypto_pool, functools.partial(
+                self.encrypted_llm.crypto.encrypt_message,
                 message,
                 self.encrypted_llm.model_public_key,
-                {
-                    "timestamp": datetime.now().isoformat(),
-                    "user_id": "gradio_user",
-                    "interface": "gradio"
-                }
-            )
+                {**self._meta_template, "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds")},
+                session=client_session
+            ))
+            encrypt_ms = (time.perf_counter() - crypto_start) * 1000
             
-            # Update status
-            status = "🤖 AI is processing... (this may take a while)"
+            # Cached alternatives belong to the previous reply
+            session["swipes"] = []
             
-            # Process with encrypted LLM
-            generation_params = {
-                'max_length': max_length,
-                'temperature': temperature,
-                'top_p': top_p
-            }
+            # Show the user message and an empty assistant message to stream into
+            history.append({"role": "user", "content": message})
+            history.append({"role": "assistant", "content": ""})
+            # Plain text while streaming: Markdown would re-parse the whole reply on every update
+            yield "", gr.update(value=history, render_markdown=False), "🤖 AI is processing... (this may take a while)", last_req, session
             
-            encrypted_response = self.encrypted_llm.process_encrypted_prompt(
-                encrypted_prompt,
-                generation_params
-            )
+            # Process with encrypted LLM (max_length, temperature, top_p)
+            generation_params = dict(gen_params)
             
-            # Decrypt response
-            decrypted_response, response_metadata = self.encrypted_llm.crypto.decrypt_message(
-                encrypted_response,
-                self.encrypted_llm.user_private_key
+            response_metadata = {}
+            decrypt_ms = 0.0
+            throttle = _UpdateThrottle()
+            frames = self.encrypted_llm.process_encrypted_prompt_stream(
+                encrypted_prompt,
+                generation_params,
+                session_state=model_session
             )
-            
-            # Update history - convert to messages format
-            history.append({"role": "user", "content": message})
-            history.append({"role": "assistant", "content": decrypted_response})
+            while True:
+                # The stream blocks on generation, so pull frames from a worker thread
+                encrypted_frame = await loop.run_in_executor(None, next, frames, None)
+                if encrypted_frame is None:
+                    break
+                
+                # Decrypt each frame as it arrives
+                crypto_start = time.perf_counter()
+                text, frame_metadata = await loop.run_in_executor(self._crypto_pool, functools.partial(
+                    self.encrypted_llm.crypto.decrypt_message,
+                    encrypted_frame,
+                    self.encrypted_llm.user_private_key,
+                    session=client_session
+                ))
+                decrypt_ms += (time.perf_counter() - crypto_start) * 1000
+                
+                if frame_metadata.get("final"):
+                    # The final frame holds the complete, cleaned response
+                    history[-1]["content"] = text
+                    response_metadata = frame_metadata
+                else:
+                    history[-1]["content"] += text
+                    # Coalesce chunks; the final yield below always sends the full text
+                    if throttle.ready():
+                        yield "", gr.update(value=history, render_markdown=False), "🔓 Streaming encrypted response...", last_req, session
             
             # Update statistics
-            self.stats['total_messages'] += 1
-            self.stats['total_generation_time'] += response_metadata.get('generation_time_seconds', 0)
-            self.stats['encryption_count'] += 2  # encrypt + decrypt
+            self.stats.total_messages += 1
+            self.stats.total_generation_time += response_metadata.get('generation_time_seconds', 0)
+            self.stats.encryption_count += 2  # encrypt + decrypt
+            self._record_timings(response_metadata.get('generation_time_seconds', 0), encrypt_ms, decrypt_ms)
             
             total_time = time.time() - start_time
-            status = f"✅ Response generated in {total_time:.2f}s (Generation: {response_metadata.get('generation_time_seconds', 0):.2f}s)"
+            status = STATUS_TMPL.format_map({
+                "total": total_time,
+                "gen": response_metadata.get('generation_time_seconds', 0)
+            })
             
-            return "", history, status
+            # Render the finished reply as Markdown once
+            yield "", gr.update(value=history, render_markdown=True), status, last_req, session
             
         except Exception as e:
             error_msg = f"❌ Error: {str(e)}"
-            return "", history, error_msg
+            yield "", gr.update(value=history, render_markdown=True), error_msg, last_req, session
+    
+    async def regenerate(
+        self,
+        history: List[Dict[str, str]],
+        gen_params: Dict[str, Any],
+        session: Dict[str, Any]
+    ) -> Tuple[List[Dict[str, str]], str, Dict[str, Any]]:
+        """
+        Swap the last reply for an alternative.
+        
+        Each click shows the next unseen candidate from the last batch; a new
+        batch is sampled once they run out, or when the last prompt is not the
+        one the cached candidates were generated for. Candidates are kept in
+        the browser session's state, alongside the prompt they answer.
+        """
+        
+        loop = asyncio.get_running_loop()
+        
+        if not history or history[-1]["role"] != "assistant":
+            return history, "Nothing to regenerate.", session
+        
+        swipes = session.get("swipes")
+        if swipes and history[-2]["content"] == session.get("swipe_prompt"):
+            history[-1]["content"] = swipes.pop(0)
+            return history, f"↻ Showing alternative ({len(swipes)} unseen left)", session
+        session["swipes"] = []
+        
+        if not self.encrypted_llm or not self.model_loaded:
+            return history, "❌ Please initialize the model first!", session
+        
+        client_session, model_session = self._crypto_sessions(session)
+        
+        try:
+            start_time = time.time()
+            crypto_start = time.perf_counter()
+            encrypted_prompt = await loop.run_in_executor(self._crypto_pool, functools.partial(
+                self.encrypted_llm.crypto.encrypt_message,
+                history[-2]["content"],
+                self.encrypted_llm.model_public_key,
+                {**self._meta_template, "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds")},
+                session=client_session
+            ))
+            encrypt_ms = (time.perf_counter() - crypto_start) * 1000
+            
+            # One batched generate call yields every candidate; it blocks, so run it off the loop
+            generation_params = {**gen_params, 'n_candidates': self.N_CANDIDATES}
+            encrypted_candidates = await loop.run_in_executor(None, functools.partial(
+                self.encrypted_llm.process_encrypted_prompt_candidates,
+                encrypted_prompt,
+                generation_params,
+                use_context=False,
+                session_state=model_session
+            ))
+            
+            # Candidates are independent, so decrypt them side by side on the crypto pool
+            crypto_start = time.perf_counter()
+            decrypted = await asyncio.gather(*(
+                loop.run_in_executor(self._crypto_pool, functools.partial(
+                    self.encrypted_llm.crypto.decrypt_message,
+                    encrypted_candidate,
+                    self.encrypted_llm.user_private_key,
+                    session=client_session
+                ))
+                for encrypted_candidate in encrypted_candidates
+            ))
+            decrypt_ms = (time.perf_counter() - crypto_start) * 1000
+            
+            candidates = [text for text, _ in decrypted]
+            generation_time = decrypted[-1][1].get('generation_time_seconds', 0) if decrypted else 0
+            
+            history[-1]["content"] = candidates[0]
+            session["swipes"] = candidates[1:]
+            session["swipe_prompt"] = history[-2]["content"]
+            
+            self.stats.total_messages += 1
+            self.stats.total_generation_time += generation_time
+            self.stats.encryption_count += 1 + 2 * len(candidates)
+            self._record_timings(generation_time, encrypt_ms, decrypt_ms)
+            
+            total_time = time.time() - start_time
+            return history, f"↻ Generated {len(candidates)} alternatives in {total_time:.2f}s", session
+            
+        except Exception as e:
+            return history, f"❌ Error: {str(e)}", session
+    
+    def _record_timings(self, generation_s: float, encrypt_ms: float, decrypt_ms: float):
+        """Store one message's timings, overwriting the oldest once the window is full."""
+        self._timings[self._timing_count % self.TIMING_WINDOW] = (generation_s, encrypt_ms, decrypt_ms)
+        self._timing_count += 1
     
     def get_stats(self) -> str:
         """Get formatted statistics."""
-        if self.stats['total_messages'] == 0:
+        if self.stats.total_messages == 0:
             return "No messages yet"
         
-        avg_time = self.stats['total_generation_time'] / self.stats['total_messages']
+        # Unchanged stats re-emit the identical string, so Gradio has nothing to re-render
+        key = (
+            self.stats.total_messages,
+            self.stats.encryption_count,
+            round(self.stats.total_generation_time, 2),
+            self._timing_count
+        )
+        if self._stats_cache is not None and self._stats_cache[0] == key:
+            return self._stats_cache[1]
         
-        return f"""
-📊 **Session Statistics**
-- Messages: {self.stats['total_messages']}
-- Avg Generation Time: {avg_time:.2f}s  
-- Encryptions: {self.stats['encryption_count']}
-- Total Gen Time: {self.stats['total_generation_time']:.1f}s
-        """
+        avg_time = self.stats.total_generation_time / self.stats.total_messages
+        
+        # Vectorized reductions over the filled part of the ring buffer
+        window = self._timings[:min(self._timing_count, self.TIMING_WINDOW)]
+        if len(window):
+            p95 = float(np.percentile(window[:, 0], 95))
+            _, enc_ms, dec_ms = window.mean(axis=0)
+        else:
+            p95 = enc_ms = dec_ms = 0.0
+        
+        text = STATS_TMPL.format_map({
+            "m": self.stats.total_messages,
+            "a": avg_time,
+            "e": self.stats.encryption_count,
+            "t": self.stats.total_generation_time,
+            "p95": p95,
+            "enc": enc_ms,
+            "dec": dec_ms
+        })
+        self._stats_cache = (key, text)
+        return text
     
-    def clear_chat(self) -> Tuple[List, str]:
-        """Clear chat history."""
-        self.chat_history = []
-        return [], "Chat cleared"
+    def clear_chat(self, session: Dict[str, Any]) -> Tuple[List, str, Dict[str, Any]]:
+        """Clear chat history and this session's cached alternatives."""
+        session["swipes"] = []
+        return [], "Chat cleared", session
     
-    def export_chat(self, history: List) -> str:
-        """Export chat history."""
+    @staticmethod
+    def _write_export(header: Dict[str, Any], history: List, statistics: Dict[str, Any], filename: str):
+        """
+        Stream an export file one message at a time, so peak memory stays at
+        one serialized message rather than a copy of the whole history.
+        """
+        if ORJSON_AVAILABLE:
+            dumps = functools.partial(orjson.dumps, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            dumps = lambda obj: json.dumps(obj).encode()
+        
+        with open(filename, 'wb') as f:
+            # Header fields first, leaving the object open for the history array
+            f.write(dumps(header)[:-1])
+            f.write(b',"chat_history":[')
+            for i, message in enumerate(history):
+                if i:
+                    f.write(b',')
+                f.write(b'\n')
+                f.write(dumps(message))
+            f.write(b'\n],"statistics":')
+            f.write(dumps(statistics))
+            f.write(b'}\n')
+    
+    async def export_chat(self, history: List) -> str:
+        """Export chat history without blocking the event loop."""
         if not history:
             return "No chat history to export"
         
         try:
-            export_data = {
+            header = {
                 'export_time': datetime.now().isoformat(),
                 'interface': 'gradio',
-                'encryption_type': self.encrypted_llm.key_type if self.encrypted_llm else 'unknown',
-                'model_name': self.encrypted_llm.model_name if self.encrypted_llm else 'unknown',
-                'chat_history': history,
-                'statistics': self.stats
+                **self._export_meta
             }
             
             filename = f"gradio_chat_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
             
-            with open(filename, 'w') as f:
-                json.dump(export_data, f, indent=2)
+            await asyncio.to_thread(self._write_export, header, history, asdict(self.stats), filename)
             
             return f"✅ Chat exported to {filename}"
             
@@ -188,30 +482,10 @@ class GradioEncryptedChat:
     def create_interface(self):
         """Create the Gradio interface."""
         
-        # Custom CSS
-        css = """
-        .gradio-container {
-            max-width: 1200px !important;
-        }
-        
-        .chat-message {
-            border-radius: 10px !important;
-            margin: 5px 0 !important;
-        }
-        
-        .encryption-status {
-            background: linear-gradient(90deg, #667eea 0%, #764ba2 100%) !important;
-            color: white !important;
-            padding: 10px !important;
-            border-radius: 5px !important;
-            margin: 10px 0 !important;
-        }
-        """
-        
         with gr.Blocks(
             title="🔐 Encrypted LLM Chat", 
             theme=gr.themes.Soft(),
-            css=css
+            css_paths=[CSS_PATH]
         ) as demo:
             
             # Header
@@ -243,6 +517,7 @@ class GradioEncryptedChat:
                             container=False
                         )
                         send_btn = gr.Button("Send 🔐", scale=1, variant="primary")
+                        regenerate_btn = gr.Button("Regenerate ↻", scale=1)
                     
                     # Status display
                     status_display = gr.Markdown("Ready to chat!", elem_classes=["encryption-status"])
@@ -288,7 +563,7 @@ class GradioEncryptedChat:
                     
                     # Statistics
                     gr.Markdown("### 📊 Statistics")
-                    stats_display = gr.Markdown("No statistics yet")
+                    stats_display = gr.Markdown("No statistics yet", every=None)
                     
                     # Controls
                     gr.Markdown("### 🛠️ Controls")
@@ -332,28 +607,63 @@ class GradioEncryptedChat:
                     outputs=[status_display]
                 )
                 
-                # Send message
-                def send_message(msg, history, max_len, temp, top_p):
-                    return self.chat_with_llm(msg, history, max_len, temp, top_p)
+                # Generation settings travel as one State, updated only when a slider is released
+                gen_params = gr.State({"max_length": 300, "temperature": 0.7, "top_p": 0.9})
+                for name, slider in (
+                    ("max_length", max_length_slider),
+                    ("temperature", temperature_slider),
+                    ("top_p", top_p_slider)
+                ):
+                    slider.release(
+                        fn=lambda value, params, name=name: {**params, name: value},
+                        inputs=[slider, gen_params],
+                        outputs=[gen_params],
+                        queue=False
+                    )
+                
+                # (message hash, monotonic time) of this session's last dispatched message
+                last_req = gr.State(None)
+                
+                # Per-browser state: AES session-key caches (see _crypto_sessions)
+                # and Regenerate's cached candidates
+                session = gr.State({})
                 
+                # Send message (an async generator, so Gradio streams each yielded update)
                 send_btn.click(
-                    fn=send_message,
-                    inputs=[msg_input, chatbot, max_length_slider, temperature_slider, top_p_slider],
-                    outputs=[msg_input, chatbot, status_display]
+                    fn=self.chat_with_llm,
+                    inputs=[msg_input, chatbot, gen_params, last_req, session],
+                    outputs=[msg_input, chatbot, status_display, last_req, session],
+                    concurrency_id="llm",
+                    concurrency_limit=1,
+                    trigger_mode="once"
                 )
                 
                 # Enter key to send
                 msg_input.submit(
-                    fn=send_message,
-                    inputs=[msg_input, chatbot, max_length_slider, temperature_slider, top_p_slider],
-                    outputs=[msg_input, chatbot, status_display]
+                    fn=self.chat_with_llm,
+                    inputs=[msg_input, chatbot, gen_params, last_req, session],
+                    outputs=[msg_input, chatbot, status_display, last_req, session],
+                    queue=True,
+                    concurrency_id="llm",
+                    concurrency_limit=1,
+                    trigger_mode="once"
+                )
+            
+                # Regenerate serves cached candidates before sampling new ones
+                regenerate_btn.click(
+                    fn=self.regenerate,
+                    inputs=[chatbot, gen_params, session],
+                    outputs=[chatbot, status_display, session],
+                    concurrency_id="llm",
+                    concurrency_limit=1
                 )
             
             # Clear chat
             clear_btn.click(
                 fn=self.clear_chat,
-                inputs=[],
-                outputs=[chatbot, status_display]
+                inputs=[session],
+                outputs=[chatbot, status_display, session],
+                concurrency_limit=None
             )
             
             # Export chat
@@ -367,7 +677,8 @@ class GradioEncryptedChat:
             refresh_stats_btn.click(
                 fn=self.get_stats,
                 inputs=[],
-                outputs=[stats_display]
+                outputs=[stats_display],
+                concurrency_limit=None
             )
         
         return demo
@@ -383,17 +694,30 @@ def main():
         print("3. Set PYTHONPATH: Run from project root directory")
         return
     
+    # Import torch/transformers in the background so the first Initialize click doesn't pay for it
+    threading.Thread(target=_load_backend, name="backend-import", daemon=True).start()
+    
     # Create and launch the app
     chat_app = GradioEncryptedChat()
     demo = chat_app.create_interface()
     
+    # LLM-bound events share the single-slot "llm" group, so the model runs one
+    # generation at a time; the default limit only applies to the other handlers
+    demo.queue(
+        default_concurrency_limit=min(8, os.cpu_count() or 1),
+        max_size=64,
+        status_update_rate="auto",
+        api_open=False
+    )
+    
     # Launch with custom settings
     demo.launch(
         server_name="0.0.0.0",  # Allow external access
         server_port=7860,
         share=False,  # Set to True to create public link
         show_error=True,
-        inbrowser=True
+        inbrowser=True,
+        allowed_paths=[STATIC_DIR]
     )
 
 
@@ -11,27 +11,54 @@ A beautiful, modern web interface that showcases:
 """
 
 import streamlit as st
+import functools
+import gzip
 import time
 import json
-import base64
+import hashlib
+import sys
+import threading
+import uuid
 from datetime import datetime
-from typing import Dict, Any, List, Optional
-import plotly.express as px
-import plotly.graph_objects as go
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Any, List, Tuple
 from pathlib import Path
 
-# Import our encrypted LLM components
-import sys
-sys.path.append('.')
-
 try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+if TYPE_CHECKING:
+    # Annotations only; the real import is deferred to _components()
+    from llm.encrypted_llm import EncryptedLLM
+
+
+
+@st.cache_resource(show_spinner=False)
+def _components() -> Dict[str, type]:
+    """Import our encrypted LLM components on first use rather than at script start."""
+    project_root = str(Path(__file__).resolve().parent.parent)
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+    
     from llm.encrypted_llm import EncryptedLLM
     from llm.model_manager import ModelManager
     from crypto.key_manager import KeyManager
-    COMPONENTS_AVAILABLE = True
-except ImportError as e:
-    COMPONENTS_AVAILABLE = False
-    st.error(f"Components not available: {e}")
+    return {"EncryptedLLM": EncryptedLLM, "ModelManager": ModelManager, "KeyManager": KeyManager}
+
+
+def _components_available() -> bool:
+    """Whether the encrypted LLM components can be imported."""
+    try:
+        _components()
+        return True
+    except ImportError as e:
+        st.error(f"Components not available: {e}")
+        return False
 
 
 # Page configuration
@@ -42,8 +69,8 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for modern styling
-st.markdown("""
+# Custom CSS for modern styling (st.html skips the Markdown pipeline)
+st.html("""
 <style>
     .main-header {
         background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
@@ -97,6 +124,12 @@ st.markdown("""
         margin: 0.5rem 0;
     }
     
+    .stats-grid {
+        display: grid;
+        grid-template-columns: 1fr 1fr;
+        gap: 0.5rem;
+    }
+    
     .status-indicator {
         width: 10px;
         height: 10px;
@@ -109,12 +142,211 @@ st.markdown("""
     .status-loading { background-color: #ffc107; }
     .status-offline { background-color: #dc3545; }
 </style>
-""", unsafe_allow_html=True)
+""")
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _certs_present(key_type: str, certs_dir: str = "certs") -> bool:
+    """Check that both user and model private keys exist (a stat, not a key parse)."""
+    certs = Path(certs_dir)
+    return (
+        (certs / f"user_{key_type}_private_key.pem").exists()
+        and (certs / f"model_{key_type}_private_key.pem").exists()
+    )
+
+
+@st.cache_data(show_spinner=False)
+def _model_choices():
+    """Supported model names and the index of the default selection."""
+    keys = list(_components()["ModelManager"].SUPPORTED_MODELS.keys())
+    return keys, keys.index("tinyllama") if "tinyllama" in keys else 0
+
+
+@st.cache_resource(show_spinner=False)
+def _build_llm(model_name: str, key_type: str) -> "EncryptedLLM":
+    """Create an EncryptedLLM once per (model, key type), shared across reruns and sessions."""
+    return _components()["EncryptedLLM"](
+        model_name=model_name,
+        key_type=key_type
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def _generation_lock() -> threading.Lock:
+    """
+    Process-wide lock held for the whole of a generation.
+    
+    _build_llm shares models across sessions, and a compiled model's static
+    KV cache and CUDA graphs can't serve two generate calls at once.
+    """
+    return threading.Lock()
+
+
+# Encryption runs here so the script thread can keep updating the status widget
+_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="crypto")
+
+# Single worker so archive appends for a session stay in order
+_ARCHIVE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+ARCHIVE_DIR = Path("chat_archive")
+
+# Static part of the metadata sent with every encrypted prompt
+_MESSAGE_META = {"user_id": "streamlit_user", "session_id": "web_session"}
+
+# Charts with more points than this are downsampled before plotting
+CHART_MAX_POINTS = 1000
+
+
+def _lttb(values: tuple, threshold: int) -> tuple:
+    """
+    Largest-Triangle-Three-Buckets downsampling of a 1-based series.
+    
+    Keeps the first and last points plus, from each bucket in between, the
+    point forming the largest triangle with its neighbours, so the visual
+    shape (peaks and dips) survives.
+    
+    Returns:
+        (x values, y values) with at most `threshold` points
+    """
+    n = len(values)
+    if n <= threshold or threshold < 3:
+        return tuple(range(1, n + 1)), values
+    
+    xs, ys = [1], [values[0]]
+    bucket = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket) + 1
+        end = int((i + 1) * bucket) + 1
+        
+        # Average of the next bucket is the triangle's third vertex
+        next_end = min(int((i + 2) * bucket) + 1, n)
+        next_slice = values[end:next_end] or values[-1:]
+        avg_x = (end + len(next_slice) / 2)
+        avg_y = sum(next_slice) / len(next_slice)
+        
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((a - avg_x) * (values[j] - values[a]) - (a - j) * (avg_y - values[a]))
+            if area > best_area:
+                best, best_area = j, area
+        
+        xs.append(best + 1)
+        ys.append(values[best])
+        a = best
+    
+    xs.append(n)
+    ys.append(values[-1])
+    return tuple(xs), tuple(ys)
+
+
+@functools.lru_cache(maxsize=1)
+def _px():
+    """Import plotly.express on first chart render rather than at app start."""
+    import plotly.express as px
+    return px
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _fig_line(generation_times: tuple):
+    """Generation time line chart, rebuilt only when the data changes."""
+    x, y = _lttb(generation_times, CHART_MAX_POINTS)
+    return _px().line(
+        x=x,
+        y=y,
+        title="AI Response Generation Time",
+        labels={'x': 'Message Number', 'y': 'Time (seconds)'}
+    )
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _fig_bar(message_lengths: tuple):
+    """Response length bar chart, rebuilt only when the data changes."""
+    x, y = _lttb(message_lengths, CHART_MAX_POINTS)
+    return _px().bar(
+        x=x,
+        y=y,
+        title="AI Response Length",
+        labels={'x': 'Message Number', 'y': 'Characters'}
+    )
+
+
+# Chat bubble markup, filled per message; rendered through st.markdown so
+# message content keeps its Markdown formatting and line breaks
+USER_TMPL = """
+<div class="user-message">
+    <strong>👤 You</strong> <span class="encryption-badge">🔐 ENCRYPTED</span>
+    <small style="float: right;">{timestamp}</small><br>
+    {content}
+</div>
+"""
+ASSISTANT_TMPL = """
+<div class="assistant-message">
+    <strong>🤖 AI Assistant</strong> <span class="encryption-badge">🔐 ENCRYPTED</span>
+    <small style="float: right;">{timestamp}</small><br>
+    {content}
+</div>
+"""
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def _demo_roundtrip(text: str, key_fingerprint: str, _encrypted_llm: "EncryptedLLM") -> Tuple[str, str]:
+    """
+    Encrypt `text` to the model key and decrypt it again.
+    
+    Cached per (text, key fingerprint); the LLM object itself is not hashed.
+    
+    Returns:
+        (encrypted bundle, decrypted text)
+    """
+    encrypted = _encrypted_llm.crypto.encrypt_message(
+        text,
+        _encrypted_llm.model_public_key,
+        {"demo": True}
+    )
+    decrypted, _ = _encrypted_llm.crypto.decrypt_message(
+        encrypted,
+        _encrypted_llm.model_private_key
+    )
+    return encrypted, decrypted
+
+
+def _key_fingerprint(public_key) -> str:
+    """Short, stable identifier for a public key."""
+    der = public_key.public_bytes(Encoding.DER, PublicFormat.SubjectPublicKeyInfo)
+    return hashlib.sha1(der).hexdigest()[:16]
+
+
+def _archive_messages(messages: List[Dict[str, Any]], path: Path, encrypted_llm: "EncryptedLLM"):
+    """
+    Append messages to a gzip-compressed NDJSON file (runs on the archive worker).
+    
+    Each line is a message encrypted to the user's public key, so nothing
+    reaches disk in plaintext.
+    """
+    bundles = encrypted_llm.crypto.encrypt_message_batch(
+        [json.dumps(message) for message in messages],
+        encrypted_llm.user_public_key
+    )
+    path.parent.mkdir(exist_ok=True)
+    with gzip.open(path, 'ab') as f:
+        for bundle in bundles:
+            f.write(bundle.encode() + b'\n')
+
+
+def _empty_running_stats() -> Dict[str, float]:
+    """Aggregates over assistant replies, updated as each reply is added."""
+    return {'n': 0, 'gt_sum': 0.0, 'gt_min': float('inf'), 'gt_max': 0.0, 'len_sum': 0}
 
 
 class EncryptedChatUI:
     """Streamlit UI for Encrypted LLM Chat."""
     
+    # Messages rendered eagerly; older ones are only built on request
+    RECENT_MESSAGES = 20
+    
+    # Messages kept in session state; older ones are spilled to disk
+    MAX_HISTORY = 500
+    
     def __init__(self):
         """Initialize the chat UI."""
         self.initialize_session_state()
@@ -136,6 +368,26 @@ class EncryptedChatUI:
         if 'total_generation_time' not in st.session_state:
             st.session_state.total_generation_time = 0.0
             
+        if 'archived_messages' not in st.session_state:
+            st.session_state.archived_messages = 0
+            st.session_state.archive_path = ARCHIVE_DIR / f"{uuid.uuid4().hex}.ndjson.gz"
+            
+        if 'enc_log' not in st.session_state:
+            # Per-message details, shown together by render_message_logs
+            st.session_state.enc_log = []
+            st.session_state.gen_log = []
+            
+        if 'analytics' not in st.session_state:
+            # Per-reply series for the analytics charts, appended as replies arrive
+            st.session_state.analytics = {'gen_times': [], 'resp_lens': []}
+            
+        if 'stats_running' not in st.session_state:
+            st.session_state.stats_running = _empty_running_stats()
+            
+        if 'crypto_sessions' not in st.session_state:
+            # AES session-key caches for the user and model sides of the stream
+            st.session_state.crypto_sessions = {'client': {}, 'model': {}}
+            
         if 'encryption_stats' not in st.session_state:
             st.session_state.encryption_stats = {
                 'messages_encrypted': 0,
@@ -145,97 +397,99 @@ class EncryptedChatUI:
     
     def render_header(self):
         """Render the main header."""
-        st.markdown("""
+        st.html("""
         <div class="main-header">
             <h1>🔐 Encrypted LLM Chat</h1>
             <p>Secure AI conversations with end-to-end encryption</p>
         </div>
-        """, unsafe_allow_html=True)
+        """)
     
+    @st.fragment
     def render_sidebar(self):
-        """Render the sidebar with controls and info."""
-        with st.sidebar:
-            st.header("🔧 Configuration")
-            
-            # Model selection
-            if COMPONENTS_AVAILABLE:
-                available_models = list(ModelManager.SUPPORTED_MODELS.keys())
-                selected_model = st.selectbox(
-                    "🤖 Select LLM Model",
-                    available_models,
-                    index=available_models.index("tinyllama") if "tinyllama" in available_models else 0,
-                    help="Choose the AI model for conversations"
-                )
-                
-                # Encryption type
-                encryption_type = st.selectbox(
-                    "🔐 Encryption Type",
-                    ["RSA-2048", "ECC-P256"],
-                    help="Choose encryption algorithm"
-                )
-                
-                # Advanced settings
-                with st.expander("⚙️ Advanced Settings"):
-                    max_length = st.slider("Max Response Length", 50, 1000, 300)
-                    temperature = st.slider("Temperature", 0.1, 2.0, 0.7, 0.1)
-                    top_p = st.slider("Top-p", 0.1, 1.0, 0.9, 0.1)
-                
-                # Initialize button
-                if st.button("🚀 Initialize Encrypted LLM", type="primary"):
-                    self.initialize_encrypted_llm(selected_model, encryption_type.lower().split('-')[0])
-                
-                # Status indicator
-                if st.session_state.encrypted_llm:
-                    status = "🟢 Online" if st.session_state.model_loaded else "🟡 Loading"
-                    st.success(f"Status: {status}")
-                else:
-                    st.error("Status: 🔴 Offline")
-            
-            st.divider()
-            
-            # Statistics
-            st.header("📊 Session Stats")
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.metric("Messages", st.session_state.total_messages)
-                st.metric("Encrypted", st.session_state.encryption_stats['messages_encrypted'])
+        """Render the sidebar with controls and info (call inside `st.sidebar`)."""
+        st.header("🔧 Configuration")
+        
+        # Model selection
+        if _components_available():
+            available_models, default_index = _model_choices()
+            selected_model = st.selectbox(
+                "🤖 Select LLM Model",
+                available_models,
+                index=default_index,
+                help="Choose the AI model for conversations"
+            )
             
-            with col2:
-                avg_time = (st.session_state.total_generation_time / max(st.session_state.total_messages, 1))
-                st.metric("Avg Time", f"{avg_time:.1f}s")
-                st.metric("Decrypted", st.session_state.encryption_stats['messages_decrypted'])
+            # Encryption type
+            encryption_type = st.selectbox(
+                "🔐 Encryption Type",
+                ["RSA-2048", "ECC-P256"],
+                help="Choose encryption algorithm"
+            )
             
-            # Security info
-            st.header("🛡️ Security Info")
-            st.info("""
-            **🔐 End-to-End Encryption**
-            - Messages encrypted with recipient's public key
-            - Only you can decrypt responses
-            - No plaintext stored or transmitted
-            - Certificate-based authentication
-            """)
+            # Advanced settings
+            with st.expander("⚙️ Advanced Settings"):
+                # Keyed so process_user_message reads the chosen values from session state
+                st.slider("Max Response Length", 50, 1000, 300, key="max_length")
+                st.slider("Temperature", 0.1, 2.0, 0.7, 0.1, key="temperature")
+                st.slider("Top-p", 0.1, 1.0, 0.9, 0.1, key="top_p")
             
-            # Export chat
-            if st.session_state.chat_history:
-                if st.button("📥 Export Chat History"):
-                    self.export_chat_history()
+            # Initialize button
+            if st.button("🚀 Initialize Encrypted LLM", type="primary"):
+                self.initialize_encrypted_llm(selected_model, encryption_type.lower().split('-')[0])
             
-            # Clear chat
-            if st.button("🗑️ Clear Chat", type="secondary"):
-                st.session_state.chat_history = []
-                st.rerun()
+            # Status indicator
+            if st.session_state.encrypted_llm:
+                status = "🟢 Online" if st.session_state.model_loaded else "🟡 Loading"
+                st.success(f"Status: {status}")
+            else:
+                st.error("Status: 🔴 Offline")
+        
+        st.divider()
+        
+        # Statistics (one HTML element rather than four metric widgets)
+        st.header("📊 Session Stats")
+        avg_time = (st.session_state.total_generation_time / max(st.session_state.total_messages, 1))
+        st.html(f"""
+        <div class="metrics-card stats-grid">
+            <div><small>Messages</small><br><strong>{st.session_state.total_messages}</strong></div>
+            <div><small>Avg Time</small><br><strong>{avg_time:.1f}s</strong></div>
+            <div><small>Encrypted</small><br><strong>{st.session_state.encryption_stats['messages_encrypted']}</strong></div>
+            <div><small>Decrypted</small><br><strong>{st.session_state.encryption_stats['messages_decrypted']}</strong></div>
+        </div>
+        """)
+        
+        # Security info
+        st.header("🛡️ Security Info")
+        st.info("""
+        **🔐 End-to-End Encryption**
+        - Messages encrypted with recipient's public key
+        - Only you can decrypt responses
+        - No plaintext stored or transmitted
+        - Certificate-based authentication
+        """)
+        
+        # Export chat
+        if st.session_state.chat_history:
+            if st.button("📥 Export Chat History"):
+                self.export_chat_history()
+        
+        # Clear chat
+        if st.button("🗑️ Clear Chat", type="secondary"):
+            st.session_state.chat_history = []
+            st.session_state.stats_running = _empty_running_stats()
+            st.session_state.analytics = {'gen_times': [], 'resp_lens': []}
+            st.session_state.enc_log = []
+            st.session_state.gen_log = []
+            st.rerun()
     
     def initialize_encrypted_llm(self, model_name: str, encryption_type: str):
         """Initialize the encrypted LLM with selected parameters."""
         try:
             with st.spinner(f"Initializing {model_name} with {encryption_type.upper()} encryption..."):
                 # Check if certificates exist
-                key_manager = KeyManager()
-                try:
-                    key_manager.load_private_key(f"user_{encryption_type}_private_key.pem")
-                    key_manager.load_private_key(f"model_{encryption_type}_private_key.pem")
-                except FileNotFoundError:
+                if not _certs_present(encryption_type):
+                    # Don't remember the miss, so freshly generated certs are picked up
+                    _certs_present.clear()
                     st.error(f"""
                     ❌ Missing {encryption_type.upper()} certificates!
                     
@@ -243,16 +497,15 @@ class EncryptedChatUI:
                     """)
                     return
                 
-                # Initialize encrypted LLM
-                encrypted_llm = EncryptedLLM(
-                    model_name=model_name,
-                    key_type=encryption_type
-                )
+                # Reuse the cached encrypted LLM (and its loaded weights) when available
+                encrypted_llm = _build_llm(model_name, encryption_type)
                 
-                # Load the model
-                if encrypted_llm.initialize_model():
+                # Load the model (a no-op once the cached instance has loaded)
+                if encrypted_llm.model_loaded or encrypted_llm.initialize_model():
                     st.session_state.encrypted_llm = encrypted_llm
                     st.session_state.model_loaded = True
+                    st.session_state.crypto_sessions = {'client': {}, 'model': {}}
+                    st.session_state.demo_key_fp = _key_fingerprint(encrypted_llm.model_public_key)
                     st.success(f"✅ {model_name} initialized with {encryption_type.upper()} encryption!")
                 else:
                     st.error("❌ Failed to initialize model")
@@ -260,17 +513,29 @@ class EncryptedChatUI:
         except Exception as e:
             st.error(f"❌ Initialization failed: {str(e)}")
     
+    @st.fragment
     def render_chat_interface(self):
-        """Render the main chat interface."""
+        """Render the main chat interface (toggles and expanders here rerun only this fragment)."""
         st.header("💬 Encrypted Chat")
         
         # Chat history
         chat_container = st.container()
         
         with chat_container:
-            if st.session_state.chat_history:
-                for i, message in enumerate(st.session_state.chat_history):
+            history = st.session_state.chat_history
+            if st.session_state.archived_messages:
+                st.caption(f"🗄️ {st.session_state.archived_messages} earlier messages archived to disk")
+            if history:
+                older = len(history) - self.RECENT_MESSAGES
+                if older > 0 and st.toggle(f"Show earlier messages ({older})", key="show_earlier"):
+                    for i, message in enumerate(history[:older]):
+                        self.render_message(message, i)
+                
+                start = max(older, 0)
+                for i, message in enumerate(history[start:], start):
                     self.render_message(message, i)
+                
+                self.render_message_logs()
             else:
                 st.info("👋 Start a conversation! Your messages will be encrypted end-to-end.")
         
@@ -301,117 +566,128 @@ class EncryptedChatUI:
         """Render a single chat message."""
         timestamp = message.get('timestamp', 'Unknown time')
         
-        if message['role'] == 'user':
-            st.markdown(f"""
-            <div class="user-message">
-                <strong>👤 You</strong> <span class="encryption-badge">🔐 ENCRYPTED</span>
-                <small style="float: right;">{timestamp}</small><br>
-                {message['content']}
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Show encryption details in expander
-            if 'encryption_info' in message:
-                with st.expander(f"🔍 Encryption Details - Message {index + 1}"):
-                    info = message['encryption_info']
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("Bundle Size", f"{info.get('bundle_size', 0)} chars")
-                    with col2:
-                        st.metric("Encryption Time", f"{info.get('encryption_time', 0):.3f}s")
-                    with col3:
-                        st.metric("Algorithm", info.get('algorithm', 'Unknown'))
-        
-        else:  # assistant
-            st.markdown(f"""
-            <div class="assistant-message">
-                <strong>🤖 AI Assistant</strong> <span class="encryption-badge">🔐 ENCRYPTED</span>
-                <small style="float: right;">{timestamp}</small><br>
-                {message['content']}
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Show generation details
-            if 'generation_info' in message:
-                with st.expander(f"⚡ Generation Details - Response {index + 1}"):
-                    info = message['generation_info']
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.metric("Generation Time", f"{info.get('generation_time', 0):.2f}s")
-                    with col2:
-                        st.metric("Response Length", f"{info.get('response_length', 0)} chars")
-                    with col3:
-                        st.metric("Model", info.get('model_name', 'Unknown'))
-                    with col4:
-                        st.metric("Temperature", info.get('temperature', 'N/A'))
+        # A stable key lets the frontend skip re-rendering unchanged messages
+        with st.container(key=f"msg_{message.get('id', index)}"):
+            if message['role'] == 'user':
+                st.markdown(USER_TMPL.format(timestamp=timestamp, content=message['content']), unsafe_allow_html=True)
+            else:  # assistant
+                st.markdown(ASSISTANT_TMPL.format(timestamp=timestamp, content=message['content']), unsafe_allow_html=True)
+    
+    def render_message_logs(self):
+        """Render per-message encryption and generation details as two tables."""
+        if not st.toggle("Show message logs", key="show_message_logs"):
+            return
+        
+        import pandas as pd
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.caption("🔍 Encryption log")
+            st.dataframe(pd.DataFrame(st.session_state.enc_log), hide_index=True, use_container_width=True)
+        with col2:
+            st.caption("⚡ Generation log")
+            st.dataframe(pd.DataFrame(st.session_state.gen_log), hide_index=True, use_container_width=True)
     
     def process_user_message(self, user_input: str):
         """Process a user message through the encrypted LLM."""
         start_time = time.time()
+        now = datetime.now()
+        
+        # Bind session-state objects once; SessionStateProxy lookups aren't free
+        llm = st.session_state.encrypted_llm
+        crypto = llm.crypto
+        sessions = st.session_state.crypto_sessions
+        history = st.session_state.chat_history
         
         # Add user message to history
         user_message = {
+            'id': uuid.uuid4().hex,
             'role': 'user',
             'content': user_input,
-            'timestamp': datetime.now().strftime("%H:%M:%S"),
+            'timestamp': now.strftime("%H:%M:%S"),
             'encryption_info': {}
         }
         
         # Show processing status
-        with st.spinner("🔐 Encrypting message..."):
+        with st.status("🔐 Encrypting message...", expanded=False) as status:
             try:
-                # Encrypt the prompt
+                # Encrypt the prompt off the script thread
                 encrypt_start = time.time()
-                encrypted_prompt = st.session_state.encrypted_llm.crypto.encrypt_message(
+                future = _EXECUTOR.submit(
+                    crypto.encrypt_message,
                     user_input,
-                    st.session_state.encrypted_llm.model_public_key,
-                    {
-                        "timestamp": datetime.now().isoformat(),
-                        "user_id": "streamlit_user",
-                        "session_id": "web_session"
-                    }
+                    llm.model_public_key,
+                    {**_MESSAGE_META, "timestamp": now.isoformat()},
+                    session=sessions['client']
                 )
+                while not future.done():
+                    time.sleep(0.05)
+                    status.update(label=f"🔐 Encrypting message... {time.time() - encrypt_start:.1f}s")
+                encrypted_prompt = future.result()
                 encrypt_time = time.time() - encrypt_start
+                status.update(label="🔐 Message encrypted", state="complete")
                 
                 # Update user message with encryption info
                 user_message['encryption_info'] = {
                     'bundle_size': len(encrypted_prompt),
                     'encryption_time': encrypt_time,
-                    'algorithm': st.session_state.encrypted_llm.key_type.upper()
+                    'algorithm': llm.key_type.upper()
                 }
                 
-                st.session_state.chat_history.append(user_message)
+                history.append(user_message)
+                st.session_state.enc_log.append({
+                    'Message': len(st.session_state.enc_log) + 1,
+                    'Bundle Size (chars)': len(encrypted_prompt),
+                    'Encryption Time (s)': round(encrypt_time, 3),
+                    'Algorithm': user_message['encryption_info']['algorithm']
+                })
                 st.session_state.encryption_stats['messages_encrypted'] += 1
                 st.session_state.encryption_stats['total_bundle_size'] += len(encrypted_prompt)
                 
             except Exception as e:
+                status.update(label="🔐 Encryption failed", state="error")
                 st.error(f"Encryption failed: {e}")
                 return
         
-        # Process with encrypted LLM
-        with st.spinner("🤖 AI is thinking... (this may take a while)"):
+        # Process with encrypted LLM, streaming the decrypted reply as it arrives
+        with st.status("🤖 AI is thinking... (this may take a while)", expanded=True) as status:
             try:
                 # Get generation parameters from sidebar
-                generation_params = {
-                    'max_length': st.session_state.get('max_length', 300),
-                    'temperature': st.session_state.get('temperature', 0.7),
-                    'top_p': st.session_state.get('top_p', 0.9)
-                }
+                generation_params = {k: st.session_state[k] for k in ("max_length", "temperature", "top_p")}
                 
-                # Process encrypted prompt
-                encrypted_response = st.session_state.encrypted_llm.process_encrypted_prompt(
-                    encrypted_prompt,
-                    generation_params
-                )
+                final = {}
                 
-                # Decrypt response
-                decrypted_response, response_metadata = st.session_state.encrypted_llm.crypto.decrypt_message(
-                    encrypted_response,
-                    st.session_state.encrypted_llm.user_private_key
-                )
+                def stream_reply():
+                    """Decrypt each encrypted frame, yielding text chunks for st.write_stream."""
+                    with lock:
+                        status.update(label="🔓 Streaming encrypted response...")
+                        for encrypted_frame in llm.process_encrypted_prompt_stream(
+                            encrypted_prompt,
+                            generation_params,
+                            session_state=sessions['model']
+                        ):
+                            text, frame_metadata = crypto.decrypt_message(
+                                encrypted_frame,
+                                llm.user_private_key,
+                                session=sessions['client']
+                            )
+                            if frame_metadata.get("final"):
+                                # The final frame holds the complete, cleaned response
+                                final['text'], final['metadata'] = text, frame_metadata
+                            else:
+                                yield text
+                
+                # Sessions share the model, so generations take turns
+                lock = _generation_lock()
+                if lock.locked():
+                    status.update(label="⏳ Waiting for another chat to finish generating...")
+                st.write_stream(stream_reply())
+                decrypted_response, response_metadata = final['text'], final['metadata']
+                status.update(label="✅ Response decrypted", state="complete", expanded=False)
                 
                 # Add assistant message to history
                 assistant_message = {
+                    'id': uuid.uuid4().hex,
                     'role': 'assistant',
                     'content': decrypted_response,
                     'timestamp': datetime.now().strftime("%H:%M:%S"),
@@ -423,7 +699,26 @@ class EncryptedChatUI:
                     }
                 }
                 
-                st.session_state.chat_history.append(assistant_message)
+                history.append(assistant_message)
+                info = assistant_message['generation_info']
+                st.session_state.gen_log.append({
+                    'Response': len(st.session_state.gen_log) + 1,
+                    'Generation Time (s)': round(info['generation_time'], 2),
+                    'Response Length (chars)': info['response_length'],
+                    'Model': info['model_name'],
+                    'Temperature': info['temperature']
+                })
+                
+                # Fold the reply into the running analytics aggregates
+                running = st.session_state.stats_running
+                generation_time = assistant_message['generation_info']['generation_time']
+                running['n'] += 1
+                running['gt_sum'] += generation_time
+                running['gt_min'] = min(running['gt_min'], generation_time)
+                running['gt_max'] = max(running['gt_max'], generation_time)
+                running['len_sum'] += len(decrypted_response)
+                st.session_state.analytics['gen_times'].append(generation_time)
+                st.session_state.analytics['resp_lens'].append(len(decrypted_response))
                 
                 # Update statistics
                 st.session_state.total_messages += 1
@@ -431,34 +726,70 @@ class EncryptedChatUI:
                 st.session_state.encryption_stats['messages_decrypted'] += 1
                 
             except Exception as e:
+                status.update(label="❌ AI processing failed", state="error")
                 st.error(f"AI processing failed: {e}")
                 # Remove the user message if processing failed
-                if st.session_state.chat_history and st.session_state.chat_history[-1]['role'] == 'user':
-                    st.session_state.chat_history.pop()
+                if history and history[-1]['role'] == 'user':
+                    history.pop()
         
-        # Rerun to show new messages
+        self._trim_history()
+        
+        # A full rerun: the sidebar stats, export button and analytics all changed too,
+        # and they live outside this fragment
         st.rerun()
     
+    def _trim_history(self):
+        """Cap chat_history at MAX_HISTORY, archiving the overflow in the background."""
+        history = st.session_state.chat_history
+        overflow = len(history) - self.MAX_HISTORY
+        if overflow <= 0:
+            return
+        
+        _ARCHIVE_EXECUTOR.submit(
+            _archive_messages,
+            history[:overflow],
+            st.session_state.archive_path,
+            st.session_state.encrypted_llm
+        )
+        del history[:overflow]
+        st.session_state.archived_messages += overflow
+        
+        # The detail logs hold one entry per exchange (two messages), so keep half as many
+        del st.session_state.enc_log[:-(self.MAX_HISTORY // 2)]
+        del st.session_state.gen_log[:-(self.MAX_HISTORY // 2)]
+    
     def export_chat_history(self):
         """Export chat history as JSON."""
         try:
-            chat_data = {
-                'export_time': datetime.now().isoformat(),
-                'total_messages': len(st.session_state.chat_history),
-                'encryption_type': st.session_state.encrypted_llm.key_type if st.session_state.encrypted_llm else 'Unknown',
-                'chat_history': st.session_state.chat_history,
-                'statistics': {
-                    'total_messages': st.session_state.total_messages,
-                    'total_generation_time': st.session_state.total_generation_time,
-                    'encryption_stats': st.session_state.encryption_stats
-                }
-            }
+            history = st.session_state.chat_history
             
-            json_str = json.dumps(chat_data, indent=2)
+            # Re-clicking without new messages reuses the last serialized payload
+            cache_key = (len(history), history[-1].get('id') if history else None, st.session_state.total_messages)
+            cached = st.session_state.get('export_cache')
+            if cached is not None and cached[0] == cache_key:
+                payload = cached[1]
+            else:
+                chat_data = {
+                    'export_time': datetime.now().isoformat(),
+                    'total_messages': len(history),
+                    'encryption_type': st.session_state.encrypted_llm.key_type if st.session_state.encrypted_llm else 'Unknown',
+                    'chat_history': history,
+                    'statistics': {
+                        'total_messages': st.session_state.total_messages,
+                        'total_generation_time': st.session_state.total_generation_time,
+                        'encryption_stats': st.session_state.encryption_stats
+                    }
+                }
+                
+                if ORJSON_AVAILABLE:
+                    payload = orjson.dumps(chat_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+                else:
+                    payload = json.dumps(chat_data, indent=2).encode()
+                st.session_state.export_cache = (cache_key, payload)
             
             st.download_button(
                 label="💾 Download Chat History",
-                data=json_str,
+                data=payload,
                 file_name=f"encrypted_chat_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                 mime="application/json"
             )
@@ -472,7 +803,8 @@ class EncryptedChatUI:
         
         demo_text = st.text_input("Enter text to see encryption:", "Hello, encrypted world!")
         
-        if demo_text and st.session_state.encrypted_llm:
+        llm = st.session_state.encrypted_llm
+        if demo_text and llm:
             try:
                 # Show encryption process
                 col1, col2 = st.columns(2)
@@ -482,23 +814,20 @@ class EncryptedChatUI:
                     st.code(demo_text)
                     st.caption(f"Length: {len(demo_text)} characters")
                 
+                # Same text and key as a previous run: reuse the round trip
+                encrypted, decrypted = _demo_roundtrip(
+                    demo_text,
+                    st.session_state.demo_key_fp,
+                    llm
+                )
+                
                 with col2:
-                    encrypted = st.session_state.encrypted_llm.crypto.encrypt_message(
-                        demo_text,
-                        st.session_state.encrypted_llm.model_public_key,
-                        {"demo": True}
-                    )
-                    
                     st.subheader("🔐 Encrypted Bundle")
                     st.code(encrypted[:200] + "..." if len(encrypted) > 200 else encrypted)
                     st.caption(f"Length: {len(encrypted)} characters")
                 
                 # Show decryption
                 st.subheader("🔓 Decryption Process")
-                decrypted, metadata = st.session_state.encrypted_llm.crypto.decrypt_message(
-                    encrypted,
-                    st.session_state.encrypted_llm.model_private_key
-                )
                 
                 if decrypted == demo_text:
                     st.success("✅ Decryption successful! Text matches original.")
@@ -510,7 +839,7 @@ class EncryptedChatUI:
     
     def run(self):
         """Run the Streamlit app."""
-        if not COMPONENTS_AVAILABLE:
+        if not _components_available():
             st.error("❌ Required components not available. Please check your installation.")
             st.info("""
             Make sure you have:
@@ -529,7 +858,9 @@ class EncryptedChatUI:
             self.render_chat_interface()
         
         with col2:
-            self.render_sidebar()
+            # Fragments can't open st.sidebar themselves, so enter it here
+            with st.sidebar:
+                self.render_sidebar()
         
         # Additional sections
         st.divider()
@@ -550,50 +881,38 @@ class EncryptedChatUI:
         st.header("📊 Performance Analytics")
         
         if st.session_state.chat_history:
-            # Extract generation times
-            generation_times = []
-            message_lengths = []
-            
-            for msg in st.session_state.chat_history:
-                if msg['role'] == 'assistant' and 'generation_info' in msg:
-                    generation_times.append(msg['generation_info'].get('generation_time', 0))
-                    message_lengths.append(msg['generation_info'].get('response_length', 0))
+            generation_times = st.session_state.analytics['gen_times']
+            message_lengths = st.session_state.analytics['resp_lens']
             
             if generation_times:
                 col1, col2 = st.columns(2)
                 
                 with col1:
                     # Generation time chart
-                    fig_time = px.line(
-                        x=list(range(1, len(generation_times) + 1)),
-                        y=generation_times,
-                        title="AI Response Generation Time",
-                        labels={'x': 'Message Number', 'y': 'Time (seconds)'}
-                    )
-                    st.plotly_chart(fig_time, use_container_width=True)
+                    st.plotly_chart(_fig_line(tuple(generation_times)), use_container_width=True)
                 
                 with col2:
-                    # Response length chart
-                    fig_length = px.bar(
-                        x=list(range(1, len(message_lengths) + 1)),
-                        y=message_lengths,
-                        title="AI Response Length",
-                        labels={'x': 'Message Number', 'y': 'Characters'}
+                    # Response length chart (static: no hover/zoom handlers to wire up)
+                    st.plotly_chart(
+                        _fig_bar(tuple(message_lengths)),
+                        use_container_width=True,
+                        config={'staticPlot': True}
                     )
-                    st.plotly_chart(fig_length, use_container_width=True)
                 
                 # Summary statistics
                 st.subheader("📈 Summary Statistics")
                 col1, col2, col3, col4 = st.columns(4)
+                running = st.session_state.stats_running
+                n = max(running['n'], 1)
                 
                 with col1:
-                    st.metric("Avg Generation Time", f"{sum(generation_times)/len(generation_times):.2f}s")
+                    st.metric("Avg Generation Time", f"{running['gt_sum'] / n:.2f}s")
                 with col2:
-                    st.metric("Fastest Response", f"{min(generation_times):.2f}s")
+                    st.metric("Fastest Response", f"{running['gt_min'] if running['n'] else 0:.2f}s")
                 with col3:
-                    st.metric("Slowest Response", f"{max(generation_times):.2f}s")
+                    st.metric("Slowest Response", f"{running['gt_max']:.2f}s")
                 with col4:
-                    st.metric("Avg Response Length", f"{sum(message_lengths)//len(message_lengths)} chars")
+                    st.metric("Avg Response Length", f"{running['len_sum'] // n} chars")
         else:
             st.info("Start chatting to see analytics!")
     